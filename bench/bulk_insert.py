@@ -0,0 +1,91 @@
+"""Compare the three bulk insert paths of insert_multiple_objects_into_db.
+
+Runs against the database configured in .env, a local Postgres is enough:
+
+    python -m bench.bulk_insert --rows 50 500 5000 --repeat 5
+
+Rows go to a temporary copy of the model table, nothing persists.
+"""
+from src.internal_apis.database_connect import db_connection_and_cursor
+from src.internal_apis.database_migrate import _column_definitions
+from src.internal_apis.database_query import _copy_rows, BULK_PAGE_SIZE
+from src.internal_apis.database_statement import insert_statement
+from src.internal_apis.models import ValuesReading, ThingThermometer, as_row
+from psycopg2.extras import execute_values
+from argparse import ArgumentParser
+from statistics import median
+from time import perf_counter, time
+from decimal import Decimal
+from random import uniform
+from uuid import uuid4
+
+
+def readings(count: int) -> list[ValuesReading]:
+    now = int(time())
+    return [
+        ValuesReading(
+            id=str(uuid4()), temperature=Decimal(f'{uniform(-30, 10):.1f}'), read_time=str(now - number),
+            db_time=now, thermometer=f'device_{number % 50}')
+        for number in range(count)]
+
+
+def thermometers(count: int) -> list[ThingThermometer]:
+    # every other page_href is NULL, the row check below also proves NULLs survive every path
+    return [
+        ThingThermometer(
+            device_id=f'device_{number}', device_group='group', device_name='',
+            page_href=None if number % 2 else f'/list?page={number // 20}')
+        for number in range(count)]
+
+
+models = {'read': (ValuesReading, readings), 'thermometer': (ThingThermometer, thermometers)}
+
+
+def insert(bench_cursor, method: str, table_name: str, columns: tuple, rows: list, page_size: int):
+    if method == 'copy':
+        _copy_rows(bench_cursor, table_name, columns, rows)
+    elif method == 'values':
+        execute_values(bench_cursor, f'INSERT INTO {table_name} ({", ".join(columns)}) VALUES %s', rows,
+                       page_size=page_size)
+    else:
+        bench_cursor.executemany(insert_statement(table_name, columns).text, rows)
+
+
+def run(model_name: str, counts: list[int], repeat: int, page_size: int):
+    model, build = models[model_name]
+    table_name = f'bench_{model.__tablename__}'
+    columns = model.__columns__
+    with db_connection_and_cursor() as (bench_connection, bench_cursor):
+        bench_cursor.execute(f'CREATE TEMP TABLE {table_name} ({", ".join(_column_definitions(model))})')
+        bench_connection.commit()
+        print(f'{"rows":>7} {"method":>7} {"median ms":>10} {"best ms":>9} {"rows/s":>10}')
+        for count in counts:
+            rows = [as_row(data_object) for data_object in build(count)]
+            nulls = sum(any(value is None for value in row) for row in rows)
+            for method in ('many', 'values', 'copy'):
+                seconds = []
+                for _ in range(repeat):
+                    bench_cursor.execute(f'TRUNCATE {table_name}')
+                    bench_connection.commit()
+                    insert_start = perf_counter()
+                    insert(bench_cursor, method, table_name, columns, rows, page_size)
+                    bench_connection.commit()
+                    seconds.append(perf_counter() - insert_start)
+                null_condition = ' OR '.join(f'{column} IS NULL' for column in columns)
+                bench_cursor.execute(f'SELECT count(*), count(*) FILTER (WHERE {null_condition}) FROM {table_name}')
+                stored, stored_nulls = bench_cursor.fetchone()
+                assert stored == count, f'{method} stored {stored} of {count} rows'
+                assert stored_nulls == nulls, f'{method} stored {stored_nulls} NULL rows, expected {nulls}'
+                print(f'{count:>7} {method:>7} {median(seconds) * 1000:>10.1f} {min(seconds) * 1000:>9.1f} '
+                      f'{count / median(seconds):>10.0f}')
+        bench_connection.rollback()
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--model', choices=sorted(models), default='read')
+    parser.add_argument('--rows', type=int, nargs='+', default=[50, 500, 5000])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--page-size', type=int, default=BULK_PAGE_SIZE)
+    arguments = parser.parse_args()
+    run(arguments.model, arguments.rows, arguments.repeat, arguments.page_size)
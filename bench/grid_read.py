@@ -0,0 +1,85 @@
+"""Container grid extraction, one script against one WebDriver call per cell.
+
+Signs in to the portal stand-in of bench/setting_flow.py, its container grid
+filled with the given numbers of containers copied from the recorded ones,
+and reads the same page with CheckContainersDriver.grid_script and with the
+per cell path it replaced, which found the labels and cells and read each
+text in its own round trip. Both reads go through _parse_value_table and
+are compared. Needs Chrome and chromedriver in /opt as in the Docker image:
+
+    python -m bench.grid_read --containers 8 50 200 --repeat 5
+"""
+from src.external_apis.drive_check import CheckContainersDriver, DriverCheck
+from src.external_apis.drive_http import CONTAINER_FIELDS
+from src.external_apis.drive_web import browser_manager
+from bench.setting_flow import portal_server
+from tests.replay_server import ReplayServer
+from selenium.webdriver.common.by import By
+from argparse import ArgumentParser
+from dataclasses import replace
+from statistics import median
+from time import perf_counter
+
+
+def with_containers(server: ReplayServer, count: int):
+    containers = next(exchange for exchange in server.recording['exchanges']
+                      if exchange['path'] == server.paths['containers'])
+    recorded = containers['body']['Data']
+    containers['body']['Data'] = [
+        {**recorded[number % len(recorded)], CONTAINER_FIELDS['id']: str(1000 + number),
+         CONTAINER_FIELDS['name']: f'MSKU{2000000 + number}'} for number in range(count)]
+
+
+def read_by_script(driver: CheckContainersDriver) -> tuple[list, list]:
+    grid = driver.driver.execute_script(driver.grid_script)
+    return grid['names'][::-1], grid['values']
+
+
+def read_per_cell(driver: CheckContainersDriver) -> tuple[list, list]:
+    # the extraction before grid_script
+    item_labels = driver.driver.find_elements(*driver.container_label_keys)
+    names = [element.text.strip() for element in item_labels][::-1]
+    values_table = driver.driver.find_elements(By.CSS_SELECTOR, 'table.k-selectable')[-1]
+    invisible_cells = values_table.find_elements(By.XPATH, "//td[@style='display:none']")
+    all_cells = values_table.find_elements(By.XPATH, "//td[@role='gridcell']")
+    return names, [cell.text for cell in all_cells if cell not in invisible_cells]
+
+
+def checks(names: list, values: list) -> list[DriverCheck]:
+    return [replace(check, database_time=0) for check in CheckContainersDriver._parse_value_table(names, values)]
+
+
+def run(counts: list[int], repeat: int, latency: float):
+    CheckContainersDriver.login, CheckContainersDriver.password = 'replay-user', 'replay-password'
+    print(f'{"containers":>10} {"cells":>6} {"path":>8} {"median ms":>10} {"best ms":>8} {"same":>5}')
+    for count in counts:
+        server = portal_server(latency)
+        with_containers(server, count)
+        server.start()
+        try:
+            CheckContainersDriver.url = server.url
+            driver = CheckContainersDriver()
+            driver.sign_in()
+            driver.wait_for_element_visibility(driver.container_label_keys)
+            read_checks = {}
+            for path, read in (('script', read_by_script), ('per cell', read_per_cell)):
+                seconds = []
+                for _ in range(repeat):
+                    read_start = perf_counter()
+                    names, values = read(driver)
+                    seconds.append(perf_counter() - read_start)
+                read_checks[path] = checks(names, values)
+                print(f'{count:>10} {len(values):>6} {path:>8} {median(seconds) * 1000:>10.1f} '
+                      f'{min(seconds) * 1000:>8.1f} {str(read_checks[path] == read_checks["script"]):>5}')
+        finally:
+            server.stop()
+    browser_manager.release(discard=True)
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--containers', type=int, nargs='+', default=[8, 50, 200])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds before each response of the portal')
+    arguments = parser.parse_args()
+    run(arguments.containers, arguments.repeat, arguments.latency)
@@ -0,0 +1,71 @@
+"""Sequential and concurrent page reads of the measurement client.
+
+Serves generated device pages from tests/measure_server.py, each answered
+after a fixed latency, and reads all of them twice with a signed in session:
+one page after the other by following the next link, as the client did
+before, and through iter_thermometers, which fetches the pages listed by the
+pager PAGE_WORKERS at a time. No measurement platform needed:
+
+    python -m bench.measure_pages --pages 1 10 50 --latency 0.05 --workers 4
+"""
+from src.external_apis import measure
+from src.external_apis.measure import (
+    DeviceRead, _MeasureSession, _get_next_page_href, _measures_from_page, _parse_page, iter_thermometers)
+from tests.measure_server import MeasureServer
+from argparse import ArgumentParser
+from statistics import median
+from time import perf_counter
+
+
+def read_sequentially() -> list[DeviceRead]:
+    session, response_content = measure.measure_session.first_view()
+    page = _parse_page(response_content)
+    reads = _measures_from_page(page)
+    while True:
+        try:
+            href = _get_next_page_href(page)
+        except StopIteration:
+            return reads
+        page = _parse_page(session.get(f'{measure.base_url}{href}').content)
+        reads += _measures_from_page(page, href)
+
+
+def read_concurrently() -> list[DeviceRead]:
+    return list(iter_thermometers())
+
+
+def run(page_counts: list[int], rows: int, latency: float, workers: int, repeat: int):
+    measure.PAGE_WORKERS = workers
+    measure.login, measure.password = 'bench-user', 'bench-password'
+    print(f'{"pages":>6} {"reads":>6} {"path":>11} {"median s":>9} {"best s":>7} {"speedup":>8}')
+    for pages in page_counts:
+        server = MeasureServer(pages=pages, rows=rows, latency=latency).start()
+        try:
+            measure.base_url = server.url
+            measure.measure_session = _MeasureSession()
+            # signs in once, both paths then start from a warm session
+            measure.measure_session.first_view()
+            sequential_median = None
+            for path, read in (('sequential', read_sequentially), ('concurrent', read_concurrently)):
+                seconds = []
+                for _ in range(repeat):
+                    read_start = perf_counter()
+                    reads = read()
+                    seconds.append(perf_counter() - read_start)
+                assert len(reads) == pages * rows, f'{path} read {len(reads)} of {pages * rows} rows'
+                sequential_median = sequential_median or median(seconds)
+                print(f'{pages:>6} {len(reads):>6} {path:>11} {median(seconds):>9.3f} {min(seconds):>7.3f} '
+                      f'{sequential_median / median(seconds):>7.1f}x')
+        finally:
+            server.stop()
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pages', type=int, nargs='+', default=[1, 10, 50])
+    parser.add_argument('--rows', type=int, default=50, help='device rows per page')
+    parser.add_argument('--latency', type=float, default=0.05, help='seconds before each page is answered')
+    parser.add_argument('--workers', type=int, default=measure.PAGE_WORKERS)
+    parser.add_argument('--repeat', type=int, default=3)
+    arguments = parser.parse_args()
+    run(arguments.pages, arguments.rows, arguments.latency, arguments.workers, arguments.repeat)
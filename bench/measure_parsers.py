@@ -0,0 +1,63 @@
+"""Time and peak memory of the two measurement page parsers.
+
+Runs the lxml and the BeautifulSoup parser over the recorded pages in
+tests/recordings/measure and over generated pages of 50 and 500 device rows
+from tests/measure_server.py. Each pass parses the page and reads its rows,
+next link and pager links, the peak is measured by tracemalloc over one pass.
+tracemalloc only sees Python allocations, the tree libxml2 builds for lxml is
+not in its peak. No measurement platform needed:
+
+    python -m bench.measure_parsers --repeat 20
+"""
+from src.external_apis.measure import _LxmlParser, _SoupParser
+from tests.measure_server import device_page
+from tests.replay_server import RECORDINGS
+from argparse import ArgumentParser
+from statistics import median
+from time import perf_counter
+from tracemalloc import start, stop, get_traced_memory
+from gc import collect
+
+
+parsers = {'lxml': _LxmlParser, 'soup': _SoupParser}
+
+
+def pages() -> dict[str, bytes]:
+    recorded = {path.stem: path.read_bytes() for path in sorted((RECORDINGS / 'measure').glob('*.html'))}
+    generated = {f'generated_{rows}': device_page(7, 23, rows).encode() for rows in (50, 500)}
+    return {**recorded, **generated}
+
+
+def extract(parser: type, content: bytes) -> tuple:
+    document = parser.parse(content)
+    return parser.table_rows(document), parser.next_page_hrefs(document), parser.pagination_hrefs(document)
+
+
+def peak_bytes(parser: type, content: bytes) -> int:
+    collect()
+    start()
+    extract(parser, content)
+    _, peak = get_traced_memory()
+    stop()
+    return peak
+
+
+def run(repeat: int):
+    print(f'{"page":>15} {"kB":>6} {"rows":>5} {"parser":>6} {"median ms":>10} {"best ms":>8} {"peak kB":>8}')
+    for name, content in pages().items():
+        for parser_name, parser in parsers.items():
+            seconds = []
+            for _ in range(repeat):
+                extract_start = perf_counter()
+                rows, _, _ = extract(parser, content)
+                seconds.append(perf_counter() - extract_start)
+            print(f'{name:>15} {len(content) / 1024:>6.1f} {len(rows):>5} {parser_name:>6} '
+                  f'{median(seconds) * 1000:>10.2f} {min(seconds) * 1000:>8.2f} '
+                  f'{peak_bytes(parser, content) / 1024:>8.0f}')
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=20)
+    arguments = parser.parse_args()
+    run(arguments.repeat)
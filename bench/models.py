@@ -0,0 +1,95 @@
+"""Per row cost and memory of model hydration and serialization.
+
+Compares the slotted models hydrated from cursor tuples with the previous
+path, plain dataclasses splatted from dict(zip(names, row)) and serialized
+through __dict__. Pure Python, no database needed:
+
+    python -m bench.models --rows 100000
+"""
+from src.internal_apis.models import ValuesCheck, ValuesReading, as_row
+from argparse import ArgumentParser
+from dataclasses import dataclass, fields
+from decimal import Decimal
+from time import perf_counter, time
+from tracemalloc import start, stop, take_snapshot
+from gc import collect
+from uuid import uuid4
+
+
+def dict_model(model: type) -> type:
+    # the model as it was before, a plain dataclass with an instance __dict__
+    annotations = {model_field.name: model_field.type for model_field in fields(model)}
+    return dataclass(type(f'Dict{model.__name__}', (), {'__annotations__': annotations}))
+
+
+def check_rows(count: int) -> list[tuple]:
+    now = int(time())
+    return [(str(uuid4()), f'container_{number % 50}', now - number, '2024-01-01 10:00', '2024-01-01 10:01', 'On',
+             Decimal('-18.0')) for number in range(count)]
+
+
+def read_rows(count: int) -> list[tuple]:
+    now = int(time())
+    return [(str(uuid4()), Decimal('-17.4'), str(now - number), now, f'device_{number % 50}') for number in range(count)]
+
+
+def hydrate_tuples(model: type, rows: list[tuple]) -> list:
+    return [model(*row) for row in rows]
+
+
+def hydrate_dicts(model: type, rows: list[tuple], names: tuple) -> list:
+    return [model(**dict(zip(names, row))) for row in rows]
+
+
+def serialize_tuples(objects: list) -> list[tuple]:
+    return [as_row(data_object) for data_object in objects]
+
+
+def serialize_dicts(objects: list, names: tuple) -> list[tuple]:
+    return [tuple(data_object.__dict__[name] for name in names) for data_object in objects]
+
+
+def timed(action, *args) -> tuple[float, object]:
+    action_start = perf_counter()
+    result = action(*args)
+    return perf_counter() - action_start, result
+
+
+def retained(action, *args) -> int:
+    collect()
+    start()
+    before = take_snapshot()
+    result = action(*args)
+    after = take_snapshot()
+    stop()
+    retained_bytes = sum(stat.size_diff for stat in after.compare_to(before, 'filename'))
+    del result
+    return retained_bytes
+
+
+def run(count: int, repeat: int):
+    print(f'{"table":>15} {"path":>7} {"hydrate us/row":>15} {"serialize us/row":>17} {"bytes/row":>10}')
+    for model, build in ((ValuesCheck, check_rows), (ValuesReading, read_rows)):
+        rows = build(count)
+        names = model.__columns__
+        plain_model = dict_model(model)
+        paths = {
+            'dicts': (lambda: hydrate_dicts(plain_model, rows, names), lambda objects: serialize_dicts(objects, names)),
+            'tuples': (lambda: hydrate_tuples(model, rows), serialize_tuples),
+        }
+        for path, (hydrate, serialize) in paths.items():
+            hydrate_time = min(timed(hydrate)[0] for _ in range(repeat))
+            objects = hydrate()
+            serialize_time = min(timed(serialize, objects)[0] for _ in range(repeat))
+            del objects
+            row_bytes = retained(hydrate) / count
+            print(f'{model.__tablename__:>15} {path:>7} {hydrate_time / count * 1e6:>15.2f} '
+                  f'{serialize_time / count * 1e6:>17.2f} {row_bytes:>10.0f}')
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=3)
+    arguments = parser.parse_args()
+    run(arguments.rows, arguments.repeat)
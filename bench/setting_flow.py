@@ -0,0 +1,78 @@
+"""End to end time of the browser setting flow against a local portal.
+
+tests/replay_server.py serves tests/recordings/portal.html, a stand-in for
+the control portal's sign in, container grid, commands grid and dialogs that
+calls the endpoints recorded in tests/recordings/control.json. Each round
+starts a new server, signs in, reads the containers and sets all of them
+with ControlContainersDriver.check_containers_and_set_temperatures, the
+first round on a cold browser. The wait and navigation stats are reset
+before every round. Needs Chrome and chromedriver where the driver launches
+them, /opt/chrome and /opt/chromedriver as in the Docker image:
+
+    python -m bench.setting_flow --rounds 5 --latency 0.05
+"""
+from src.external_apis.drive_control import ControlContainersDriver
+from src.external_apis.drive_http import CONTAINER_FIELDS, COMMAND_FIELDS
+from src.external_apis.drive_web import browser_manager, wait_stats, navigation_stats
+from tests.replay_server import RECORDINGS, ReplayServer
+from argparse import ArgumentParser
+from statistics import median
+from time import perf_counter
+from json import dumps
+
+
+SETTINGS = {container: '-1.0' for container in (
+    'MSKU1000011', 'MSKU1000022', 'MSKU1000033', 'MSKU1000044', 'MSKU1000055', 'MSKU1000066', 'MSKU1000088')}
+
+
+def portal_server(latency: float) -> ReplayServer:
+    server = ReplayServer(latency=latency)
+    page = (RECORDINGS / 'portal.html').read_text()
+    for placeholder, values in (('__PATHS__', server.paths), ('__CONTAINER_FIELDS__', CONTAINER_FIELDS),
+                                ('__COMMAND_FIELDS__', COMMAND_FIELDS)):
+        page = page.replace(placeholder, dumps(values))
+    server.serve_page(page)
+    return server
+
+
+def run(rounds: int, latency: float, debug: bool):
+    ControlContainersDriver.login, ControlContainersDriver.password = 'replay-user', 'replay-password'
+    ControlContainersDriver.debug = debug
+    print(f'{"round":>5} {"browser":>7} {"total s":>8} {"set":>4} {"set s":>6} {"waits":>6} {"wait s":>7} '
+          f'{"pages":>6} {"usable s":>9}')
+    outcomes = []
+    for number in range(1, rounds + 1):
+        server = portal_server(latency).start()
+        try:
+            ControlContainersDriver.url = server.url
+            wait_stats.reset()
+            navigation_stats.reset()
+            flow_start = perf_counter()
+            outcomes = ControlContainersDriver().check_containers_and_set_temperatures(SETTINGS)
+            total = perf_counter() - flow_start
+        finally:
+            server.stop()
+        waits = wait_stats.stats()
+        navigations = navigation_stats.stats()
+        set_outcomes = [outcome for outcome in outcomes if outcome.outcome == 'set']
+        print(f'{number:>5} {"cold" if browser_manager.cold_starts == number else "warm":>7} {total:>8.3f} '
+              f'{len(set_outcomes):>4} {sum(outcome.seconds for outcome in set_outcomes):>6.2f} '
+              f'{sum(wait["count"] for wait in waits.values()):>6} '
+              f'{sum(wait["count"] * wait["avg"] for wait in waits.values()):>7.2f} '
+              f'{navigations["count"]:>6} {navigations["avg_usable"] or 0:>9.3f}')
+    print(f'\n{"container":>12} {"outcome":>21} {"s":>6}')
+    for outcome in outcomes:
+        print(f'{outcome.container:>12} {outcome.outcome:>21} {outcome.seconds:>6.2f}')
+    print(f'\n{"wait":>13} {"count":>6} {"avg s":>6} {"max s":>6}')
+    for wait_name, wait in wait_stats.stats().items():
+        print(f'{wait_name:>13} {wait["count"]:>6} {wait["avg"]:>6.3f} {wait["max"]:>6.3f}')
+    browser_manager.release(discard=True)
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--latency', type=float, default=0.05, help='seconds before each response of the portal')
+    parser.add_argument('--debug', action='store_true', help='close the set point dialog instead of executing')
+    arguments = parser.parse_args()
+    run(arguments.rounds, arguments.latency, arguments.debug)
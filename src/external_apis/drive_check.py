@@ -1,7 +1,8 @@
-from src.external_apis.drive_web import _BrowserDriver
-from time import time, sleep
+from src.external_apis.drive_web import _BrowserDriver, browser_manager
+from time import time, sleep, monotonic
 from selenium.common.exceptions import NoSuchElementException, TimeoutException
 from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as ec
 from dataclasses import dataclass
 from logging import info, warning
 from typing import Union
@@ -18,6 +19,7 @@ class DriverCheck:
 
 
 class _ContainersDriver(_BrowserDriver):
+    container_label_keys = (By.CSS_SELECTOR, "span.emerson-menu-cursor.emerson-container-item-label")
 
     def find_and_fill_input(self, field: str, input_value: str):
         input_field = self.wait_for_element_and_click((By.XPATH, f"//input[@placeholder='{field}']"))
@@ -31,12 +33,29 @@ class _ContainersDriver(_BrowserDriver):
         except NoSuchElementException:
             pass
 
+    def _is_signed_in(self) -> bool:
+        sign_in_keys = (By.CSS_SELECTOR, 'button.btn.btn-primary')
+        try:
+            self.driver_wait().until(ec.any_of(
+                ec.visibility_of_element_located(sign_in_keys),
+                ec.visibility_of_element_located(self.container_label_keys)))
+        except TimeoutException:
+            return False
+        return bool(self.driver.find_elements(*self.container_label_keys))
+
     def sign_in(self):
+        self.navigate(self.url)
+        if self.is_warm and self._is_signed_in():
+            info('driver still signed in')
+            browser_manager.sign_in_skips += 1
+            return
+        browser_manager.sign_ins += 1
         info('driver signing in!')
-        self.driver.get(self.url)
         sign_in_button = self.wait_for_element_visibility((By.CSS_SELECTOR, 'button.btn.btn-primary'))
+        self.record_navigation()
         self.find_and_fill_input('Username', self.login)
         self.find_and_fill_input('Password', self.password)
+        self.expect_navigation()
         sign_in_button.click()
         self.click_not_now()
 
@@ -44,21 +63,26 @@ class _ContainersDriver(_BrowserDriver):
 class CheckContainersDriver(_ContainersDriver):
     check_values: Union[None, list[DriverCheck]] = None
 
-    def _read_container_names(self) -> list:
-        info('driver reading container names')
-        container_label_keys = (By.CSS_SELECTOR, "span.emerson-menu-cursor.emerson-container-item-label")
-        self.wait_for_element_visibility(container_label_keys)
-        item_labels = self.driver.find_elements(*container_label_keys)
-        name_elements = [element.text.strip() for element in item_labels][::-1]
-        return name_elements
-
-    def _read_container_values(self) -> list:
-        info('driver reading container values')
-        values_table = self.driver.find_elements(By.CSS_SELECTOR, "table.k-selectable")[-1]
-        invisible_cells = values_table.find_elements(By.XPATH, "//td[@style='display:none']")
-        all_cells = values_table.find_elements(By.XPATH, "//td[@role='gridcell']")
-        value_cells = [cell.text for cell in all_cells if cell not in invisible_cells]
-        return value_cells
+    # grid cells are read document wide, _parse_value_table skips the leading name cells
+    grid_script = '''
+        const labels = document.querySelectorAll('span.emerson-menu-cursor.emerson-container-item-label');
+        const cells = document.querySelectorAll('td[role="gridcell"]');
+        return {
+            names: Array.from(labels, label => label.innerText.trim()),
+            values: Array.from(cells)
+                .filter(cell => cell.getAttribute('style') !== 'display:none')
+                .map(cell => cell.innerText.trim())
+        };
+    '''
+
+    def _read_container_grid(self) -> tuple[list, list]:
+        info('driver reading container names and values')
+        self.wait_for_element_visibility(self.container_label_keys)
+        read_start = monotonic()
+        grid = self.driver.execute_script(self.grid_script)
+        info(f'driver read {len(grid["values"])} cells in {monotonic() - read_start:.3f} s')
+        self.record_navigation()
+        return grid['names'][::-1], grid['values']
 
     @staticmethod
     def _parse_value_table(names: list, all_values: list) -> list[DriverCheck]:
@@ -82,8 +106,7 @@ class CheckContainersDriver(_ContainersDriver):
 
     def _container_values_reading_action(self) -> list[DriverCheck]:
         info('driver reading container data')
-        names = self._read_container_names()
-        values = self._read_container_values()
+        names, values = self._read_container_grid()
         self.check_values = self._parse_value_table(names, values)
         return self.check_values
 
@@ -106,5 +129,5 @@ class CheckContainersDriver(_ContainersDriver):
         info('driver reading container values process start')
         self.sign_in()
         container_data = self._load_data_table()
-        self.driver.close()
+        self.release()
         return container_data
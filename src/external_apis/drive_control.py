@@ -1,4 +1,3 @@
-from time import sleep
 from src.external_apis.drive_check import CheckContainersDriver, DriverCheck
 from selenium.webdriver.common.action_chains import ActionChains
 from selenium.common.exceptions import NoSuchElementException, ElementNotInteractableException
@@ -6,19 +5,45 @@ from selenium.webdriver.common.by import By
 from logging import info, warning
 from decimal import Decimal
 from typing import Union
+from dataclasses import dataclass
+from time import monotonic
 
 
 class DriverExecuteError(Exception):
-    def __init__(self, message):
+    def __init__(self, message="Container unavailable for settings"):
         warning('driver execute error')
         self.message = message
         super().__init__(self.message)
 
 
+@dataclass(frozen=True)
+class SettingOutcome:
+    container: str
+    temperature: str
+    outcome: str
+    seconds: float
+    check: Union[None, DriverCheck]
+
+
+def grid_outcome(check: Union[None, DriverCheck], temperature: str) -> Union[None, str]:
+    # outcome known from the grid read alone, None when a command is needed
+    if check is None:
+        return 'missing'
+    if check.power == 'Off':
+        return 'off'
+    if check.setpoint == '':
+        return 'no set point'
+    if Decimal(check.setpoint) == Decimal(temperature):
+        return 'active'
+    return None
+
+
 class ControlContainersDriver(CheckContainersDriver):
     container: str
     temperature: str
     debug: bool = False
+    execute_buttons_keys = (By.CSS_SELECTOR, '#container-grid-detail-commands a.k-grid-executeCommand.k-button')
+    setpoint_command_index = 2
     if debug:
         warning('debug active')
 
@@ -30,7 +55,7 @@ class ControlContainersDriver(CheckContainersDriver):
 
     def _open_temperature_setting_modal(self):
         info('driver opening settings modal')
-        execute_button = self.driver.find_elements(By.CSS_SELECTOR, "a.k-grid-executeCommand.k-button")[2]
+        execute_button = self.driver.find_elements(*self.execute_buttons_keys)[self.setpoint_command_index]
         execute_button.click()
 
     def _enter_temperature_setting(self):
@@ -39,7 +64,8 @@ class ControlContainersDriver(CheckContainersDriver):
         if not self.debug:
             self.wait_for_element_and_click((By.ID, 'temperatureSetpointExecuteBtn'))
             info('driver click! Execute button')
-            sleep(max(0.5, self.wait_time / 5))
+            self.wait_for_dialog_closed('commandsDialog')
+            self.wait_for_loading()
         else:
             commands_dialog = self.driver.find_elements(By.ID, 'commandsDialog')[0]
             cancel_button = commands_dialog.find_elements(By.CSS_SELECTOR, 'button.btn.btn-default')[0]
@@ -47,12 +73,12 @@ class ControlContainersDriver(CheckContainersDriver):
             cancel_button.click()
 
     def _wait_for_commands_menu(self):
-        menu_wait = self.wait_time * 1.2
-        info(f'driver shamefully implicitly waiting for commands menu {menu_wait} seconds')
-        # loading_image = self.driver.find_element(By.CSS_SELECTOR, "div.k-loading-image")
-        # logging.info(f'{loading_image.get_attribute("outerHTML")}')
-        # self.driver_wait().until(ec.invisibility_of_element_located((By.CSS_SELECTOR, "div.k-loading-image")))
-        sleep(menu_wait)
+        info('driver waiting for commands menu')
+        self.wait_for_element_visibility((By.ID, 'container-grid-detail-commands'))
+        self.wait_for_loading()
+        # the rows render before their buttons, the set point command is the third of them
+        buttons = self.wait_for_stable_rows(self.execute_buttons_keys, minimum=self.setpoint_command_index + 1)
+        info(f'driver commands menu loaded, execute buttons: {buttons}')
 
     def _cancel_previous_setting(self):
         info('driver attempted canceling previous setting')
@@ -65,11 +91,11 @@ class ControlContainersDriver(CheckContainersDriver):
             cancel_button = cancel_buttons.pop()
             info(f'driver click "{cancel_button.text}"')
             cancel_button.click()
-            sleep(max(0.5, self.wait_time / 5))
-            sure_modal = self.wait_for_element_visibility((By.ID, 'confirmationDialog'))
+            sure_modal = self.wait_for_dialog('confirmationDialog')
             sure_ok_button = sure_modal.find_element(By.CSS_SELECTOR, "button.btn.btn-primary")
             info(f'driver click "{sure_ok_button.text}"')
             ActionChains(self.driver).move_to_element(sure_ok_button).click(sure_ok_button).perform()
+            self.wait_for_dialog_closed('confirmationDialog')
             self._wait_for_commands_menu()
 
     def _previous_setting_awaiting_confirmation(self):
@@ -133,6 +159,51 @@ class ControlContainersDriver(CheckContainersDriver):
             warning('driver setting unavailable')
             pass
         finally:
-            info('driver closing')
-            self.driver.close()
+            self.release()
             return self.check_values
+
+    def check_containers(self) -> list[DriverCheck]:
+        info('driver checking containers, session kept open for settings')
+        self.sign_in()
+        return self._load_data_table()
+
+    def _reset_view(self):
+        info('driver reloading container view')
+        self.navigate(self.url)
+        self.wait_for_element_visibility(self.container_label_keys)
+        self.wait_for_loading()
+        self.record_navigation()
+
+    def set_temperatures(self, settings: dict[str, str]) -> list[SettingOutcome]:
+        info(f'driver setting {len(settings)} containers in one session')
+        if self.check_values is None:
+            self.check_containers()
+        checks = {check.name: check for check in self.check_values}
+        outcomes = []
+        view_used = False
+        for container, temperature in settings.items():
+            self.container, self.temperature = container, temperature
+            setting_start = monotonic()
+            # one container failing, in the page or on its grid values, leaves the others to be set
+            try:
+                outcome = grid_outcome(checks.get(container), temperature)
+                if outcome is None:
+                    if view_used:
+                        self._reset_view()
+                    view_used = True
+                    self._temperature_setting_action()
+                    outcome = 'set'
+            except Exception as ex:
+                warning(f'driver setting failed in {container}: {ex!r}')
+                outcome = 'failed'
+            outcomes.append(SettingOutcome(
+                container, temperature, outcome, round(monotonic() - setting_start, 3), checks.get(container)))
+            info(f'driver {container}: {outcome}')
+        return outcomes
+
+    def check_containers_and_set_temperatures(self, settings: dict[str, str]) -> list[SettingOutcome]:
+        try:
+            self.check_containers()
+            return self.set_temperatures(settings)
+        finally:
+            self.release()
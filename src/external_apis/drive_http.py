@@ -0,0 +1,333 @@
+from src.external_apis.drive_check import DriverCheck
+from src.external_apis.drive_control import ControlContainersDriver, SettingOutcome, grid_outcome
+from src.external_apis.login import filled_login_params, is_login_page
+from requests import Session, Response, RequestException
+from threading import Lock
+from time import time, monotonic
+from typing import Union
+from logging import info, warning
+from pathlib import Path
+from dotenv import dotenv_values
+
+
+dotenv_path = Path(__file__).parent.parent.parent / '.env'
+env_values = dotenv_values(dotenv_path)
+
+# endpoints called by the portal's kendo grids and command dialogs, python -m tests.record_control records them
+SIGN_IN_PATH = env_values.get('CONTROL_HTTP_SIGN_IN_PATH') or '/Account/Login'
+CONTAINERS_PATH = env_values.get('CONTROL_HTTP_CONTAINERS_PATH') or '/Container/ReadContainers'
+COMMANDS_PATH = env_values.get('CONTROL_HTTP_COMMANDS_PATH') or '/Container/ReadCommands'
+COMMAND_PATH = env_values.get('CONTROL_HTTP_COMMAND_PATH') or '/Container/ExecuteSetpointCommand'
+CANCEL_PATH = env_values.get('CONTROL_HTTP_CANCEL_PATH') or '/Container/CancelCommand'
+
+# kendo data sources post the grid state as a form
+GRID_REQUEST = {'sort': '', 'page': '1', 'pageSize': '500', 'group': '', 'filter': ''}
+XHR_HEADERS = {'X-Requested-With': 'XMLHttpRequest'}
+TOKEN_FIELD = '__RequestVerificationToken'
+# posted by the login script when the page inputs carry no names
+SIGN_IN_FIELDS = {'login': 'UserName', 'password': 'Password'}
+
+# grid row keys of the containers endpoint, by DriverCheck field
+CONTAINER_FIELDS = {
+    'id': 'Id',
+    'name': 'Name',
+    'logged': 'LastLoggedDate',
+    'received': 'LastReceivedDate',
+    'power': 'PowerStatus',
+    'setpoint': 'Setpoint',
+}
+# grid row keys of the commands endpoint
+COMMAND_FIELDS = {
+    'id': 'Id',
+    'status': 'Status',
+    'cancellable': 'CanCancel',
+}
+RESULT_FIELD = 'Success'
+AWAITING_CONFIRMATION = 'Awaiting confirmation'
+
+
+class HttpDriverError(Exception):
+    def __init__(self, message="Unexpected control platform response"):
+        warning('http driver error')
+        self.message = message
+        super().__init__(self.message)
+
+
+def _is_json(response: Response) -> bool:
+    return 'json' in response.headers.get('Content-Type', '')
+
+
+def json_body(response: Response, described: str) -> Union[dict, list]:
+    try:
+        if _is_json(response):
+            return response.json()
+    except ValueError:
+        pass
+    raise HttpDriverError(f'{described} response is not JSON')
+
+
+def refusal(result: Union[dict, list]) -> Union[None, str]:
+    # kendo reports model state errors under Errors, the portal's actions a Success flag
+    if isinstance(result, dict):
+        if result.get('Errors'):
+            return str(result['Errors'])
+        if result.get(RESULT_FIELD) is False:
+            return f'{RESULT_FIELD} false'
+    return None
+
+
+def grid_rows(response: Response, described: str) -> list[dict]:
+    grid = json_body(response, described)
+    refused = refusal(grid)
+    if refused:
+        raise HttpDriverError(f'{described} refused: {refused}')
+    rows = grid.get('Data') if isinstance(grid, dict) else grid
+    if not isinstance(rows, list):
+        raise HttpDriverError(f'{described} response holds no rows')
+    return rows
+
+
+def command_accepted(response: Response, described: str) -> bool:
+    # an explicit refusal is an outcome, a body without a result is an error
+    result = json_body(response, described)
+    refused = refusal(result)
+    if refused:
+        warning(f'http driver {described} refused: {refused}')
+        return False
+    if not isinstance(result, dict) or RESULT_FIELD not in result:
+        raise HttpDriverError(f'{described} response holds no {RESULT_FIELD}')
+    return bool(result[RESULT_FIELD])
+
+
+class _ControlSession:
+    session: Union[None, Session]
+    sign_ins: int
+    url: str
+    login: str
+    password: str
+
+    def __init__(self, url: Union[None, str] = None, login: Union[None, str] = None, password: Union[None, str] = None):
+        # the browser driver's .env settings unless given
+        self.url = url or ControlContainersDriver.url
+        self.login = login or ControlContainersDriver.login
+        self.password = password or ControlContainersDriver.password
+        self.session = None
+        self.sign_ins = 0
+        self._lock = Lock()
+
+    def _url(self, path: str) -> str:
+        return f'{self.url.rstrip("/")}{path}'
+
+    def _sign_in_params(self, login_page_content: bytes) -> dict:
+        login_params = filled_login_params(
+            login_page_content=login_page_content,
+            login=self.login,
+            password=self.password)
+        credentials = {'login': self.login, 'password': self.password}
+        for field, key in SIGN_IN_FIELDS.items():
+            if credentials[field] not in login_params.values():
+                login_params[key] = credentials[field]
+        return login_params
+
+    def _sign_in(self):
+        # the login page carries the anti forgery token, its script posts it along with the credentials
+        sign_in_start = monotonic()
+        login_response = self.session.get(self.url)
+        if not is_login_page(login_response.content):
+            return
+        login_params = self._sign_in_params(login_response.content)
+        headers = dict(XHR_HEADERS)
+        if login_params.get(TOKEN_FIELD):
+            headers['RequestVerificationToken'] = login_params[TOKEN_FIELD]
+        signed_in = self.session.post(self._url(SIGN_IN_PATH), data=login_params, headers=headers)
+        refused = refusal(json_body(signed_in, 'sign in')) if _is_json(signed_in) else None
+        if signed_in.status_code >= 400 or refused or is_login_page(signed_in.content):
+            raise HttpDriverError(f'Control platform sign in rejected {refused or signed_in.status_code}')
+        self.sign_ins += 1
+        info(f'http driver signed in, {monotonic() - sign_in_start:.3f} s')
+
+    @staticmethod
+    def _is_signed_out(response: Response) -> bool:
+        if response.status_code in (401, 403):
+            return True
+        return not _is_json(response) and is_login_page(response.content)
+
+    def request(self, method: str, path: str, **kwargs) -> Response:
+        kwargs.setdefault('headers', XHR_HEADERS)
+        with self._lock:
+            if self.session is None:
+                self.session = Session()
+                self._sign_in()
+            request_url = self._url(path)
+            response = self.session.request(method, request_url, **kwargs)
+            if self._is_signed_out(response):
+                info('http driver session signed out')
+                self._sign_in()
+                response = self.session.request(method, request_url, **kwargs)
+            response.raise_for_status()
+            return response
+
+
+control_session = _ControlSession()
+
+
+class HttpContainersDriver:
+    container: str
+    temperature: str
+    check_values: Union[None, list[DriverCheck]] = None
+    container_ids: dict[str, str]
+    # settings done so far in the current call, kept when a transport error interrupts it
+    outcomes: list[SettingOutcome]
+    transport_errors = (RequestException, HttpDriverError)
+    session: _ControlSession
+
+    def __init__(self, session: Union[None, _ControlSession] = None):
+        self.session = session or control_session
+        self.container_ids = {}
+        self.outcomes = []
+
+    @staticmethod
+    def _field_value(row: dict, field: str, row_fields: dict = CONTAINER_FIELDS) -> str:
+        value = row.get(row_fields[field])
+        return '' if value is None else str(value)
+
+    def read_values(self) -> list[DriverCheck]:
+        info('http driver reading container values')
+        rows = grid_rows(self.session.request('POST', CONTAINERS_PATH, data=GRID_REQUEST), 'containers')
+        time_now = int(time())
+        self.container_ids = {self._field_value(row, 'name'): self._field_value(row, 'id') for row in rows}
+        self.check_values = [
+            DriverCheck(
+                name=self._field_value(row, 'name'),
+                logged=self._field_value(row, 'logged'),
+                received=self._field_value(row, 'received'),
+                power=self._field_value(row, 'power'),
+                setpoint=self._field_value(row, 'setpoint'),
+                database_time=time_now
+            ) for row in rows]
+        return self.check_values
+
+    def _read_commands(self, container_id: str) -> list[dict]:
+        response = self.session.request('POST', COMMANDS_PATH, data={**GRID_REQUEST, 'containerId': container_id})
+        return grid_rows(response, 'commands')
+
+    def _command_status(self, command: dict) -> str:
+        return self._field_value(command, 'status', COMMAND_FIELDS)
+
+    def _cancel_previous_setting(self, container_id: str) -> list[dict]:
+        commands = self._read_commands(container_id)
+        cancellable = [
+            command for command in commands
+            if command.get(COMMAND_FIELDS['cancellable']) and self._command_status(command) != AWAITING_CONFIRMATION]
+        for command in cancellable:
+            command_id = self._field_value(command, 'id', COMMAND_FIELDS)
+            info(f'http driver canceling previous setting {command_id}')
+            response = self.session.request('POST', CANCEL_PATH, data={'commandId': command_id})
+            if not command_accepted(response, 'cancel'):
+                raise HttpDriverError(f'Cancel of command {command_id} refused')
+        return self._read_commands(container_id) if cancellable else commands
+
+    def _execute_setting(self) -> str:
+        info(f'http driver setting: {self.temperature}°C in container: {self.container}')
+        container_id = self.container_ids.get(self.container)
+        if not container_id:
+            raise HttpDriverError(f'No id of container {self.container}')
+        commands = self._cancel_previous_setting(container_id)
+        if any(self._command_status(command) == AWAITING_CONFIRMATION for command in commands):
+            info('http driver: "Awaiting previous setting confirmation"')
+            return 'awaiting confirmation'
+        response = self.session.request(
+            'POST', COMMAND_PATH, data={'containerId': container_id, 'setpoint': self.temperature})
+        return 'set' if command_accepted(response, 'set point command') else 'failed'
+
+    def check_containers(self) -> list[DriverCheck]:
+        return self.read_values()
+
+    def set_temperatures(self, settings: dict[str, str]) -> list[SettingOutcome]:
+        info(f'http driver setting {len(settings)} containers')
+        if self.check_values is None:
+            self.read_values()
+        checks = {check.name: check for check in self.check_values}
+        self.outcomes = []
+        for container, temperature in settings.items():
+            self.container, self.temperature = container, temperature
+            setting_start = monotonic()
+            try:
+                outcome = grid_outcome(checks.get(container), temperature)
+                if outcome is None:
+                    outcome = self._execute_setting()
+            except self.transport_errors:
+                raise
+            except Exception as ex:
+                warning(f'http driver setting failed in {container}: {ex!r}')
+                outcome = 'failed'
+            self.outcomes.append(SettingOutcome(
+                container, temperature, outcome, round(monotonic() - setting_start, 3), checks.get(container)))
+            info(f'http driver {container}: {outcome}')
+        return self.outcomes
+
+    def check_containers_and_set_temperatures(self, settings: dict[str, str]) -> list[SettingOutcome]:
+        self.outcomes = []
+        self.read_values()
+        return self.set_temperatures(settings)
+
+    def check_containers_and_set_temperature(self, container: str, temperature: str) -> list[DriverCheck]:
+        info('http driver check containers and set temperature')
+        self.check_containers_and_set_temperatures({container: temperature})
+        return self.check_values
+
+    def release(self):
+        pass
+
+
+class _FallbackContainersDriver:
+    # the browser is only launched when the http client fails, and then serves the remaining calls
+    fallback_errors = HttpContainersDriver.transport_errors
+    _driver: Union[HttpContainersDriver, ControlContainersDriver]
+
+    def __init__(self, session: Union[None, _ControlSession] = None):
+        self._driver = HttpContainersDriver(session)
+
+    def _call(self, method_name: str, *args):
+        if isinstance(self._driver, HttpContainersDriver):
+            try:
+                return getattr(self._driver, method_name)(*args)
+            except self.fallback_errors as ex:
+                warning(f'http driver failed, falling back to browser: {ex!r}')
+                self._driver = ControlContainersDriver()
+        return getattr(self._driver, method_name)(*args)
+
+    def _call_settings(self, method_name: str, settings: dict[str, str]) -> list[SettingOutcome]:
+        # containers the http client already handled are not set again in the browser
+        if isinstance(self._driver, HttpContainersDriver):
+            try:
+                return getattr(self._driver, method_name)(settings)
+            except self.fallback_errors as ex:
+                done = self._driver.outcomes
+                warning(f'http driver failed after {len(done)} settings, falling back to browser: {ex!r}')
+                self._driver = ControlContainersDriver()
+                done_containers = {outcome.container for outcome in done}
+                remaining = {
+                    container: temperature for container, temperature in settings.items()
+                    if container not in done_containers}
+                return done + getattr(self._driver, method_name)(remaining)
+        return getattr(self._driver, method_name)(settings)
+
+    def read_values(self) -> list[DriverCheck]:
+        return self._call('read_values')
+
+    def check_containers(self) -> list[DriverCheck]:
+        return self._call('check_containers')
+
+    def set_temperatures(self, settings: dict[str, str]) -> list[SettingOutcome]:
+        return self._call_settings('set_temperatures', settings)
+
+    def check_containers_and_set_temperatures(self, settings: dict[str, str]) -> list[SettingOutcome]:
+        return self._call_settings('check_containers_and_set_temperatures', settings)
+
+    def check_containers_and_set_temperature(self, container: str, temperature: str) -> list[DriverCheck]:
+        return self._call('check_containers_and_set_temperature', container, temperature)
+
+    def release(self):
+        self._driver.release()
+
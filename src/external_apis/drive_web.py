@@ -2,48 +2,284 @@ from selenium import webdriver
 from tempfile import mkdtemp
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as ec
+from selenium.webdriver.common.by import By
+from selenium.common.exceptions import WebDriverException
 from pathlib import Path
 from dotenv import dotenv_values
+from threading import Lock
+from atexit import register
+from time import monotonic
+from typing import Union
+from logging import info, warning
 
 
 dotenv_path = Path(__file__).parent.parent.parent / '.env'
 env_values = dotenv_values(dotenv_path)
 
 
+BROWSER_LEAN = (env_values.get('CONTROL_BROWSER_LEAN') or '').lower() in ('1', 'true', 'yes')
+LEAN_BLOCKED_URLS = (
+    '*.png', '*.jpg', '*.jpeg', '*.gif', '*.svg', '*.ico', '*.webp',
+    '*.woff', '*.woff2', '*.ttf', '*.otf', '*.eot',
+    '*google-analytics.com*', '*googletagmanager.com*', '*doubleclick.net*', '*hotjar.com*', '*clarity.ms*',
+)
+# blocked patterns the portal turns out to need, e.g. "*.png" for kendo sprites
+LEAN_ALLOWED_URLS = tuple(
+    pattern.strip() for pattern in (env_values.get('CONTROL_BROWSER_ALLOW') or '').split(',') if pattern.strip())
+
+# transferred bytes of the document and its resources so far, and time to DOMContentLoaded
+NAVIGATION_SCRIPT = '''
+    const [navigation] = performance.getEntriesByType('navigation');
+    const resources = performance.getEntriesByType('resource');
+    return {
+        bytes: resources.reduce((total, entry) => total + (entry.transferSize || 0),
+            navigation ? navigation.transferSize || 0 : 0),
+        resources: resources.length,
+        ready: navigation ? navigation.domContentLoadedEventEnd / 1000 : null
+    };
+'''
+
+
+def _block_resources(browser: webdriver.Chrome):
+    blocked_urls = [pattern for pattern in LEAN_BLOCKED_URLS if pattern not in LEAN_ALLOWED_URLS]
+    browser.execute_cdp_cmd('Network.enable', {})
+    browser.execute_cdp_cmd('Network.setBlockedURLs', {'urls': blocked_urls})
+    info(f'driver lean mode blocking {len(blocked_urls)} url patterns')
+
+
+def _launch_chrome() -> webdriver.Chrome:
+    options = webdriver.ChromeOptions()
+    service = webdriver.ChromeService("/opt/chromedriver")
+
+    options.binary_location = '/opt/chrome/chrome'
+    options.add_argument("--headless=new")
+    options.add_argument('--no-sandbox')
+    options.add_argument("--disable-gpu")
+    options.add_argument("--window-size=1280x1696")
+    options.add_argument("--single-process")
+    options.add_argument("--disable-dev-shm-usage")
+    options.add_argument("--disable-dev-tools")
+    options.add_argument("--no-zygote")
+    options.add_argument(f"--user-data-dir={mkdtemp()}")
+    options.add_argument(f"--data-path={mkdtemp()}")
+    options.add_argument(f"--disk-cache-dir={mkdtemp()}")
+    options.add_argument("--remote-debugging-port=9222")
+    if BROWSER_LEAN:
+        options.page_load_strategy = 'eager'
+
+    browser = webdriver.Chrome(options=options, service=service)
+    if BROWSER_LEAN:
+        _block_resources(browser)
+    return browser
+
+
+class _BrowserManager:
+    browser: Union[None, webdriver.Chrome]
+    cold_starts: int
+    warm_starts: int
+    cold_time: float
+    warm_time: float
+    sign_ins: int
+    sign_in_skips: int
+
+    def __init__(self):
+        self.browser = None
+        self.cold_starts = 0
+        self.warm_starts = 0
+        self.cold_time = 0.0
+        self.warm_time = 0.0
+        self.sign_ins = 0
+        self.sign_in_skips = 0
+        self._lock = Lock()
+
+    def _is_alive(self) -> bool:
+        try:
+            self.browser.execute_script('return 1')
+            return True
+        except WebDriverException as ex:
+            warning(f'driver browser unresponsive: {ex}')
+            return False
+
+    def _quit(self):
+        try:
+            self.browser.quit()
+        except WebDriverException:
+            pass
+        self.browser = None
+
+    def acquire(self) -> tuple[webdriver.Chrome, bool]:
+        # the browser is shared by every driver, flows drive it one at a time
+        with self._lock:
+            start = monotonic()
+            if self.browser is not None and self._is_alive():
+                self.warm_starts += 1
+                self.warm_time += monotonic() - start
+                info(f'driver warm start, {monotonic() - start:.3f} s')
+                return self.browser, True
+            if self.browser is not None:
+                self._quit()
+            self.browser = _launch_chrome()
+            self.cold_starts += 1
+            self.cold_time += monotonic() - start
+            info(f'driver cold start, {monotonic() - start:.3f} s')
+            return self.browser, False
+
+    def release(self, discard: bool = False):
+        if discard:
+            with self._lock:
+                if self.browser is not None:
+                    self._quit()
+
+    def stats(self) -> dict:
+        return {
+            'cold_starts': self.cold_starts,
+            'warm_starts': self.warm_starts,
+            'cold_time': round(self.cold_time, 3),
+            'warm_time': round(self.warm_time, 3),
+            'sign_ins': self.sign_ins,
+            'sign_in_skips': self.sign_in_skips
+        }
+
+
+browser_manager = _BrowserManager()
+register(browser_manager.release, True)
+
+
+class _WaitStats:
+    def __init__(self):
+        self._latencies: dict[str, list[float]] = {}
+        self._lock = Lock()
+
+    def add(self, wait_name: str, seconds: float):
+        with self._lock:
+            self._latencies.setdefault(wait_name, []).append(seconds)
+
+    def reset(self):
+        with self._lock:
+            self._latencies = {}
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                wait_name: {
+                    'count': len(latencies),
+                    'avg': round(sum(latencies) / len(latencies), 3),
+                    'max': round(max(latencies), 3)
+                } for wait_name, latencies in self._latencies.items()}
+
+
+wait_stats = _WaitStats()
+
+
+class _NavigationStats:
+    def __init__(self):
+        self._navigations: list[dict] = []
+        self._lock = Lock()
+
+    def add(self, navigation: dict):
+        with self._lock:
+            self._navigations.append(navigation)
+
+    def reset(self):
+        with self._lock:
+            self._navigations = []
+
+    def stats(self) -> dict:
+        with self._lock:
+            ready_times = [n['ready'] for n in self._navigations if n['ready'] is not None]
+            usable_times = [n['usable'] for n in self._navigations]
+            return {
+                'lean': BROWSER_LEAN,
+                'count': len(self._navigations),
+                'bytes': sum(n['bytes'] for n in self._navigations),
+                'avg_ready': round(sum(ready_times) / len(ready_times), 3) if ready_times else None,
+                'max_ready': round(max(ready_times), 3) if ready_times else None,
+                'avg_usable': round(sum(usable_times) / len(usable_times), 3) if usable_times else None,
+                'max_usable': round(max(usable_times), 3) if usable_times else None
+            }
+
+
+navigation_stats = _NavigationStats()
+
+
 class _BrowserDriver:
     wait_time = 5
-    url = env_values['CONTROL_URL']
-    login = env_values['CONTROL_LOGIN']
-    password = env_values['CONTROL_PASSWORD']
+    poll_interval = 0.1
+    loading_keys = (By.CSS_SELECTOR, 'div.k-loading-mask, div.k-loading-image')
+    url = env_values.get('CONTROL_URL')
+    login = env_values.get('CONTROL_LOGIN')
+    password = env_values.get('CONTROL_PASSWORD')
+    is_warm: bool
+    _navigation_start: Union[None, float] = None
 
     def __init__(self):
-        options = webdriver.ChromeOptions()
-        service = webdriver.ChromeService("/opt/chromedriver")
-
-        options.binary_location = '/opt/chrome/chrome'
-        options.add_argument("--headless=new")
-        options.add_argument('--no-sandbox')
-        options.add_argument("--disable-gpu")
-        options.add_argument("--window-size=1280x1696")
-        options.add_argument("--single-process")
-        options.add_argument("--disable-dev-shm-usage")
-        options.add_argument("--disable-dev-tools")
-        options.add_argument("--no-zygote")
-        options.add_argument(f"--user-data-dir={mkdtemp()}")
-        options.add_argument(f"--data-path={mkdtemp()}")
-        options.add_argument(f"--disk-cache-dir={mkdtemp()}")
-        options.add_argument("--remote-debugging-port=9222")
-
-        self.driver = webdriver.Chrome(options=options, service=service)
+        self.driver, self.is_warm = browser_manager.acquire()
+
+    def release(self, discard: bool = False):
+        info('driver releasing browser')
+        browser_manager.release(discard)
+
+    def navigate(self, url: str):
+        # measured by record_navigation once the page is usable
+        self.expect_navigation()
+        self.driver.get(url)
+        info(f'driver navigated, returned {monotonic() - self._navigation_start:.3f} s')
+
+    def expect_navigation(self):
+        self._navigation_start = monotonic()
+
+    def record_navigation(self):
+        # the eager strategy returns at DOMContentLoaded, the grid's own requests only finish later
+        if self._navigation_start is None:
+            return
+        usable = monotonic() - self._navigation_start
+        self._navigation_start = None
+        try:
+            navigation = self.driver.execute_script(NAVIGATION_SCRIPT)
+        except WebDriverException as ex:
+            warning(f'driver navigation timing unavailable: {ex}')
+            navigation = {'bytes': 0, 'resources': 0, 'ready': None}
+        navigation['usable'] = round(usable, 3)
+        navigation_stats.add(navigation)
+        ready = 'n/a' if navigation['ready'] is None else f"{navigation['ready']:.3f} s"
+        info(f"driver page usable {usable:.3f} s, ready {ready}, "
+             f"{navigation['bytes']} bytes in {navigation['resources'] + 1} requests")
 
     def driver_wait(self):
-        return WebDriverWait(self.driver, self.wait_time)
+        return WebDriverWait(self.driver, self.wait_time, poll_frequency=self.poll_interval)
+
+    def timed_wait(self, wait_name: str, condition):
+        wait_start = monotonic()
+        try:
+            return self.driver_wait().until(condition)
+        finally:
+            wait_stats.add(wait_name, monotonic() - wait_start)
 
     def wait_for_element_and_click(self, *args, click: bool = True):
-        element = self.driver_wait().until(ec.element_to_be_clickable(*args))
+        element = self.timed_wait('clickable', ec.element_to_be_clickable(*args))
         if click:
             element.click()
         return element
 
     def wait_for_element_visibility(self, *args):
-        return self.driver_wait().until(ec.visibility_of_element_located(*args))
+        return self.timed_wait('visible', ec.visibility_of_element_located(*args))
+
+    def wait_for_loading(self):
+        return self.timed_wait('loading', ec.invisibility_of_element_located(self.loading_keys))
+
+    def wait_for_dialog(self, dialog_id: str):
+        return self.timed_wait('dialog open', ec.visibility_of_element_located((By.ID, dialog_id)))
+
+    def wait_for_dialog_closed(self, dialog_id: str):
+        return self.timed_wait('dialog closed', ec.invisibility_of_element_located((By.ID, dialog_id)))
+
+    def wait_for_stable_rows(self, rows_keys: tuple, minimum: int = 1, polls: int = 2) -> int:
+        # the row count has to reach the minimum and repeat over consecutive polls, kendo grids render rows in batches
+        counts = []
+
+        def _is_stable(driver) -> bool:
+            counts.append(len(driver.find_elements(*rows_keys)))
+            return counts[-1] >= minimum and len(counts) > polls and len(set(counts[-polls - 1:])) == 1
+
+        self.timed_wait('stable rows', _is_stable)
+        return counts[-1]
@@ -2,11 +2,15 @@ from io import BytesIO
 from lxml import etree
 
 
-def login_params(page_content):
-    params = dict()
+def _inputs(page_content):
     parser = etree.HTMLParser()
     tree = etree.parse(BytesIO(page_content), parser=parser)
-    for elem in tree.findall('//input'):
+    return tree.findall('//input')
+
+
+def login_params(page_content):
+    params = dict()
+    for elem in _inputs(page_content):
         name = elem.get('name')
         if name is not None:
             params[name] = elem.get('value', None)
@@ -26,3 +30,11 @@ def filled_login_params(login_page_content, login, password):
                 token_params[key] = variable
     return token_params
 
+
+def is_login_page(page_content) -> bool:
+    if not page_content.strip():
+        return False
+    # script driven forms leave their inputs unnamed, the password type gives them away
+    return any(
+        'password' in (elem.get('name') or '').lower() or (elem.get('type') or '').lower() == 'password'
+        for elem in _inputs(page_content))
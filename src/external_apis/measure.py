@@ -1,8 +1,15 @@
-from src.external_apis.login import filled_login_params
-from requests import Session
+from src.external_apis.login import filled_login_params, is_login_page
+from requests import Session, Response
 from bs4 import BeautifulSoup
-from typing import Union
-from time import time
+from lxml.html import HtmlElement, document_fromstring
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, Union
+from collections import deque
+from itertools import islice
+from time import time, monotonic
+from re import finditer
+from logging import info, warning
+from threading import Lock
 from dataclasses import dataclass
 from pathlib import Path
 from dotenv import dotenv_values
@@ -15,6 +22,8 @@ env_values = dotenv_values(dotenv_path)
 base_url = env_values.get('MEASURE_URL')
 login = env_values.get('MEASURE_LOGIN')
 password = env_values.get('MEASURE_PASSWORD')
+PAGE_WORKERS = int(env_values.get('MEASURE_PAGE_WORKERS') or 4)
+SNAPSHOT_TTL = int(env_values.get('MEASURE_SNAPSHOT_TTL') or 120)
 
 
 @dataclass(frozen=True)
@@ -25,10 +34,10 @@ class DeviceRead:
     temperature: str
     measure_time: str
     database_time: int
+    page_href: str = ''
 
 
-def _login_and_get_first_view(session: Session) -> bytes:
-    login_response = session.get(base_url)
+def _login_and_get_first_view(session: Session, login_response: Response) -> bytes:
     login_content = login_response.content
     login_params = filled_login_params(
         login_page_content=login_content,
@@ -41,52 +50,241 @@ def _login_and_get_first_view(session: Session) -> bytes:
     return response_content
 
 
-def _measure_table_rows(soup: BeautifulSoup) -> list[list]:
-    table = [
-        [cell.text.strip() for cell in row.find_all('td')]
-        for row in soup.find_all('tr')]
-    rows_with_values = [row for row in table if len(row) == 7]
-    return rows_with_values
+class _MeasureSession:
+    session: Union[None, Session]
+    logins: int
+    reuses: int
+    expirations: int
+    login_time: float
 
+    def __init__(self):
+        self.session = None
+        self.logins = 0
+        self.reuses = 0
+        self.expirations = 0
+        self.login_time = 0.0
+        self._lock = Lock()
 
-def _measures_from_page(content: BeautifulSoup) -> list[DeviceRead]:
-    table_rows = _measure_table_rows(content)
+    def _login(self, login_response: Response) -> bytes:
+        login_start = monotonic()
+        response_content = _login_and_get_first_view(self.session, login_response)
+        login_time = monotonic() - login_start
+        self.logins += 1
+        self.login_time += login_time
+        info(f'measure logged in, {login_time:.3f} s')
+        return response_content
+
+    def first_view(self) -> tuple[Session, bytes]:
+        with self._lock:
+            is_warm = self.session is not None
+            if not is_warm:
+                self.session = Session()
+            response = self.session.get(base_url)
+            if not is_login_page(response.content):
+                self.reuses += 1
+                info('measure session reused')
+                return self.session, response.content
+            if is_warm:
+                warning('measure session expired')
+                self.expirations += 1
+            return self.session, self._login(response)
+
+    def stats(self) -> dict:
+        return {
+            'logins': self.logins,
+            'reuses': self.reuses,
+            'expirations': self.expirations,
+            'login_time': round(self.login_time, 3)
+        }
+
+
+measure_session = _MeasureSession()
+
+
+class _SoupParser:
+    @staticmethod
+    def parse(response_content: bytes) -> BeautifulSoup:
+        return BeautifulSoup(response_content, 'html.parser')
+
+    @staticmethod
+    def table_rows(content_soup: BeautifulSoup) -> list[list]:
+        table = [
+            [cell.text.strip() for cell in row.find_all('td')]
+            for row in content_soup.find_all('tr')]
+        rows_with_values = [row for row in table if len(row) == 7]
+        return rows_with_values
+
+    @staticmethod
+    def next_page_hrefs(content_soup: BeautifulSoup) -> list[str]:
+        next_page = content_soup.find_all('li', {'class': 'next'})
+        return [link['href'] for link in next_page.pop().find_all(href=True)] if next_page else []
+
+    @staticmethod
+    def pagination_hrefs(content_soup: BeautifulSoup) -> list[str]:
+        return [link['href'] for item in content_soup.find_all('li') for link in item.find_all(href=True)]
+
+
+class _LxmlParser:
+    @staticmethod
+    def parse(response_content: bytes) -> HtmlElement:
+        return document_fromstring(response_content)
+
+    @staticmethod
+    def table_rows(document: HtmlElement) -> list[list]:
+        return [
+            [str(cell.text_content()).strip() for cell in row.iter('td')]
+            for row in document.xpath('//tr[count(.//td) = 7]')]
+
+    @staticmethod
+    def next_page_hrefs(document: HtmlElement) -> list[str]:
+        next_page = document.xpath("//li[contains(concat(' ', normalize-space(@class), ' '), ' next ')]")
+        return [str(href) for href in next_page[-1].xpath('.//*[@href]/@href')] if next_page else []
+
+    @staticmethod
+    def pagination_hrefs(document: HtmlElement) -> list[str]:
+        return [str(href) for href in document.xpath('//li//*[@href]/@href')]
+
+
+page_parser = {'soup': _SoupParser, 'lxml': _LxmlParser}[env_values.get('MEASURE_PARSER') or 'lxml']
+Page = Union[BeautifulSoup, HtmlElement]
+
+
+def _measures_from_page(content: Page, page_href: str = '') -> list[DeviceRead]:
+    table_rows = page_parser.table_rows(content)
     devices_readings = list()
     time_now = int(time())
     for table_row in table_rows:
         _, _, name, group, value, device_time, _id = table_row
         devices_readings.append(
-            DeviceRead(_id, name, group, value, device_time, time_now))
+            DeviceRead(_id, name, group, value, device_time, time_now, page_href))
     return devices_readings
 
 
-def _get_next_page_href(content_soup: BeautifulSoup) -> Union[str, IndexError]:
-    next_page = content_soup.find_all('li', {'class': 'next'})
-    if not next_page:
+def _get_next_page_href(content: Page) -> Union[str, IndexError]:
+    next_page_hrefs = page_parser.next_page_hrefs(content)
+    if not next_page_hrefs:
         raise StopIteration('No more pages')
-    next_page_href = next_page.pop().find_all(href=True).pop()['href']
-    return next_page_href
-
-
-def _recursively_read_table_pages(session: Session, response_content: bytes, all_measures: list) -> list[DeviceRead]:
-    content_soup = BeautifulSoup(response_content, 'html.parser')
-    page_measures = _measures_from_page(content_soup)
-    all_measures += page_measures
-    try:
-        next_href = _get_next_page_href(content_soup)
-    except StopIteration:
-        pass
-    else:
-        next_url = f'{base_url}{next_href}'
-        response_content = session.get(next_url).content
-        _recursively_read_table_pages(session, response_content, all_measures)
-    finally:
-        return all_measures
-
-
-def read_all_thermometers() -> list[DeviceRead]:
-    session = Session()
-    response_content = _login_and_get_first_view(session)
-    all_devices = []
-    all_devices = _recursively_read_table_pages(session, response_content, all_devices)
-    return all_devices
+    return next_page_hrefs.pop()
+
+
+def _parse_page(response_content: bytes) -> Page:
+    return page_parser.parse(response_content)
+
+
+def _following_page_hrefs(content: Page) -> list[str]:
+    next_href = _get_next_page_href(content)
+    page_numbers = list(finditer(r'\d+', next_href))
+    if not page_numbers:
+        return [next_href]
+    next_number = page_numbers[-1]
+    prefix, suffix = next_href[:next_number.start()], next_href[next_number.end():]
+    numbers = {int(next_number.group())}
+    for href in page_parser.pagination_hrefs(content):
+        if href.startswith(prefix) and href.endswith(suffix):
+            number = href[len(prefix):len(href) - len(suffix)]
+            if number.isdigit():
+                numbers.add(int(number))
+    return [f'{prefix}{number}{suffix}' for number in range(int(next_number.group()), max(numbers) + 1)]
+
+
+def _iter_pages(session: Session, hrefs: list[str]) -> Iterator[tuple[str, Page]]:
+    # at most PAGE_WORKERS pages are in flight or waiting to be consumed
+    def _fetch_page(href: str) -> Page:
+        return _parse_page(session.get(f'{base_url}{href}').content)
+
+    pending_hrefs = iter(hrefs)
+    with ThreadPoolExecutor(max_workers=PAGE_WORKERS) as executor:
+        window = deque(
+            (href, executor.submit(_fetch_page, href)) for href in islice(pending_hrefs, PAGE_WORKERS))
+        try:
+            while window:
+                href, fetched_page = window.popleft()
+                for next_href in islice(pending_hrefs, 1):
+                    window.append((next_href, executor.submit(_fetch_page, next_href)))
+                yield href, fetched_page.result()
+        finally:
+            for _, fetched_page in window:
+                fetched_page.cancel()
+
+
+def iter_thermometers() -> Iterator[DeviceRead]:
+    session, response_content = measure_session.first_view()
+    page = _parse_page(response_content)
+    yield from _measures_from_page(page)
+    while True:
+        try:
+            following_hrefs = _following_page_hrefs(page)
+        except StopIteration:
+            break
+        info(f'measure fetching {len(following_hrefs)} pages')
+        for page_href, page in _iter_pages(session, following_hrefs):
+            yield from _measures_from_page(page, page_href)
+    info(f'measure session {measure_session.stats()}')
+
+
+class _MeasureSnapshot:
+    reads: Union[None, list[DeviceRead]]
+    taken: float
+    hits: int
+    misses: int
+
+    def __init__(self, ttl: int = SNAPSHOT_TTL):
+        self.ttl = ttl
+        self.reads = None
+        self.taken = 0.0
+        self.hits = 0
+        self.misses = 0
+        self._lock = Lock()
+
+    def age(self) -> Union[None, float]:
+        return None if self.reads is None else monotonic() - self.taken
+
+    def cached(self) -> Union[None, list[DeviceRead]]:
+        with self._lock:
+            age = self.age()
+            if age is None or age >= self.ttl:
+                return None
+            self.hits += 1
+            info(f'measure snapshot hit, {age:.1f} s old')
+            return list(self.reads)
+
+    def get(self, fresh: bool = False) -> list[DeviceRead]:
+        requested = monotonic()
+        # callers arriving during a scrape wait for it and share its result
+        with self._lock:
+            age = self.age()
+            is_valid = age is not None and (self.taken >= requested if fresh else age < self.ttl)
+            if is_valid:
+                self.hits += 1
+                info(f'measure snapshot hit, {age:.1f} s old')
+            else:
+                self.misses += 1
+                self.reads = list(iter_thermometers())
+                self.taken = monotonic()
+            return list(self.reads)
+
+    def stats(self) -> dict:
+        age = self.age()
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'age': None if age is None else round(age, 1)
+        }
+
+
+measure_snapshot = _MeasureSnapshot()
+
+
+def read_all_thermometers(fresh: bool = False) -> list[DeviceRead]:
+    return measure_snapshot.get(fresh)
+
+
+def read_thermometer_pages(page_hrefs: set[str]) -> list[DeviceRead]:
+    session, response_content = measure_session.first_view()
+    page_measures = _measures_from_page(_parse_page(response_content)) if '' in page_hrefs else []
+    following_hrefs = sorted(page_hrefs - {''})
+    if following_hrefs:
+        info(f'measure fetching {len(following_hrefs)} indexed pages')
+        for page_href, page in _iter_pages(session, following_hrefs):
+            page_measures += _measures_from_page(page, page_href)
+    return page_measures
@@ -0,0 +1,106 @@
+from src.external_apis.drive_control import ControlContainersDriver
+from src.external_apis.measure import read_all_thermometers
+from src.external_processes.tasking import TaskingRunning
+from src.external_processes.setting import SettingExecution, SettingProcess
+from src.internal_apis.database_query import select_from_db, unit_of_work, commit_writes
+from src.internal_apis.models import ValuesTasking, ValuesSetting
+from src.internal_processes.checking import save_driver_checks
+from src.internal_processes.driving import driving_plan, DrivingConflict
+from time import monotonic
+from logging import info, warning
+
+
+SETTING_APPLIED = ('set', 'active')
+
+
+def running_ids(model: type) -> list[str]:
+    return select_from_db(model.__tablename__, columns=['id'], where_equals={'status': 'running'}, keys=False)
+
+
+def perform_all() -> dict:
+    timings = {}
+    performed_runs = []
+    results = {'tasks': {}, 'sets': {}, 'containers': {}, 'timings': timings}
+
+    def timed(phase: str, action, *args):
+        phase_start = monotonic()
+        try:
+            return action(*args)
+        finally:
+            timings[phase] = round(monotonic() - phase_start, 3)
+            info(f'batch {phase} took {timings[phase]} s')
+
+    def run_task(task_id: str) -> TaskingRunning:
+        tasking = TaskingRunning(task_id=task_id)
+        tasking.run_task()
+        return tasking
+
+    def run_set(set_id: str) -> SettingProcess:
+        performed_set = SettingExecution.get_performed_set(set_id)
+        if performed_set.status == 'running':
+            performed_set.run_and_check()
+        return performed_set
+
+    def run_each(kind: str, run, run_ids: list[str]):
+        # one failing task or set does not stop the others, the writes wait for the setting outcomes
+        for run_id in run_ids:
+            performed = None
+            with driving_plan.claiming() as claimed:
+                try:
+                    with unit_of_work.deferred() as writes:
+                        performed = timed(f'{kind} {run_id}', run, run_id)
+                    status = performed.task.status if kind == 'task' else performed.status
+                except DrivingConflict as ex:
+                    warning(f'batch {kind} {run_id} retried next run: {ex.message}')
+                    status = 'conflict'
+                except Exception as ex:
+                    warning(f'batch {kind} {run_id} failed: {ex!r}')
+                    status = 'failed'
+            results[f'{kind}s'][run_id] = {'status': status, 'time': timings[f'{kind} {run_id}']}
+            if performed is not None:
+                performed_runs.append((kind, run_id, performed, writes, list(claimed)))
+
+    def persist(outcomes: dict[str, str]):
+        # a run keeps its control and status only once each of its containers was set
+        for kind, run_id, performed, writes, claimed in performed_runs:
+            failed = {container: outcomes.get(container, 'not driven') for container in claimed
+                      if outcomes.get(container) not in SETTING_APPLIED}
+            if not failed:
+                commit_writes(writes)
+                continue
+            warning(f'batch {kind} {run_id} discarding its writes, containers {failed}')
+            if kind == 'task' and 'off' in failed.values():
+                # as the browser driver does with a container off
+                performed.drive_error_task()
+                results['tasks'][run_id]['status'] = 'error'
+            else:
+                results[f'{kind}s'][run_id]['status'] = 'running'
+
+    batch_start = monotonic()
+    task_ids = running_ids(ValuesTasking)
+    set_ids = running_ids(ValuesSetting)
+    info(f'batch running tasks: {len(task_ids)}, sets: {len(set_ids)}')
+    if task_ids or set_ids:
+        driver = ControlContainersDriver()
+        try:
+            driver_checks = timed('containers snapshot', driver.check_containers)
+            save_driver_checks(driver_checks)
+            timed('thermometers scrape', read_all_thermometers, True)
+            with driving_plan.collecting(driver_checks) as targets:
+                run_each('task', run_task, task_ids)
+                run_each('set', run_set, set_ids)
+            outcomes = []
+            try:
+                if targets:
+                    outcomes = timed('containers setting', driver.set_temperatures, targets)
+            finally:
+                results['containers'] = {
+                    setting.container: {
+                        'temperature': setting.temperature, 'outcome': setting.outcome, 'time': setting.seconds}
+                    for setting in outcomes}
+                persist({container: setting['outcome'] for container, setting in results['containers'].items()})
+        finally:
+            driver.release()
+    timings['total'] = round(monotonic() - batch_start, 3)
+    info(f'batch results {results}')
+    return results
@@ -1,18 +1,30 @@
 from src.external_apis.drive_control import CheckContainersDriver
-from src.external_apis.measure import read_all_thermometers
-from src.internal_apis.database_query import insert_multiple_objects_into_db, clear_table
+from src.external_apis.measure import iter_thermometers
+from src.internal_apis.database_query import insert_multiple_objects_into_db, truncate_tables, unit_of_work
 from src.internal_apis.models import ThingContainer, ValuesCheck, ThingThermometer, data_objects
+from concurrent.futures import ThreadPoolExecutor
+from time import monotonic
 from uuid import uuid4
 from logging import info
 
 
-def initialize_database():
+def initialize_database() -> dict:
+    timings = {}
 
-    def insert_containers():
+    def timed(phase: str, action, *args):
+        phase_start = monotonic()
+        result = action(*args)
+        timings[phase] = round(monotonic() - phase_start, 3)
+        info(f'init {phase} took {timings[phase]} s')
+        return result
+
+    def scrape_containers() -> list:
+        return CheckContainersDriver().read_values()
+
+    def insert_containers(container_values_read: list):
         info('init inserting containers')
-        container_values_read = CheckContainersDriver().read_values()
         containers = [ThingContainer(name=container.name) for container in container_values_read]
-        insert_multiple_objects_into_db(containers)
+        insert_multiple_objects_into_db(containers, method='copy')
 
         check_data = [
             ValuesCheck(
@@ -25,24 +37,39 @@ def initialize_database():
                 read_setpoint=c.setpoint
             )
             for c in container_values_read]
-        insert_multiple_objects_into_db(check_data)
+        insert_multiple_objects_into_db(check_data, method='copy')
 
-    def insert_thermometers():
-        info('init inserting thermometers')
-        thermometers = [
+    def scrape_thermometers() -> list[ThingThermometer]:
+        # reads are converted as pages arrive, no page outlives its own rows
+        return [
             ThingThermometer(
                 device_id=thermometer.device_id,
                 device_name=thermometer.device_name,
-                device_group=thermometer.group
-            ) for thermometer in read_all_thermometers()]
-        insert_multiple_objects_into_db(thermometers)
+                device_group=thermometer.group,
+                page_href=thermometer.page_href
+            ) for thermometer in iter_thermometers()]
+
+    def insert_thermometers(thermometers: list[ThingThermometer]):
+        info('init inserting thermometers')
+        insert_multiple_objects_into_db(thermometers, method='copy')
 
     def clear_data_tables():
         info('init clear data tables')
-        for cleared_object in data_objects:
-            clear_table(cleared_object.__tablename__)
+        truncate_tables([cleared_object.__tablename__ for cleared_object in data_objects])
 
-    clear_data_tables()
-    insert_containers()
-    insert_thermometers()
+    def clear_and_load(container_values_read: list, thermometers: list[ThingThermometer]):
+        # tables are replaced in one transaction, readers never see them empty
+        with unit_of_work:
+            clear_data_tables()
+            insert_containers(container_values_read)
+            insert_thermometers(thermometers)
 
+    initialize_start = monotonic()
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        containers_scrape = executor.submit(timed, 'containers scrape', scrape_containers)
+        thermometers_scrape = executor.submit(timed, 'thermometers scrape', scrape_thermometers)
+        scraped_containers, scraped_thermometers = containers_scrape.result(), thermometers_scrape.result()
+    timed('database load', clear_and_load, scraped_containers, scraped_thermometers)
+    timings['total'] = round(monotonic() - initialize_start, 3)
+    info(f'init timings {timings}')
+    return timings
@@ -1,5 +1,5 @@
 from src.external_apis.drive_control import DriverCheck
-from src.internal_apis.database_query import select_from_db, update_status_in_db
+from src.internal_apis.database_query import select_from_db, update_status_in_db, unit_of_work
 from src.internal_apis.models import ValuesSetting
 from src.internal_processes.checking import CheckingSetting
 from src.internal_processes.controlling import ControllingSetting
@@ -62,25 +62,27 @@ class SettingProcess(SettingDriving):
 
     def run_and_check(self):
         info('setting process started')
-        self.prepare()
-        self.execute_and_save_logs()
-        try:
-            setting_check = self.checking.temperature_setting_verification()
-        except ValueError:
-            warning('setting no point for comparison, set may be retried')
-        else:
-            info('setting check found, proceeding')
-            self.end_or_continue(setting_check)
+        with unit_of_work:
+            self.prepare()
+            self.execute_and_save_logs()
+            try:
+                setting_check = self.checking.temperature_setting_verification()
+            except ValueError:
+                warning('setting no point for comparison, set may be retried')
+            else:
+                info('setting check found, proceeding')
+                self.end_or_continue(setting_check)
 
 
 class SettingExecution:
     @staticmethod
     def get_performed_set(set_id: str) -> SettingProcess:
         info('setting fetching parameters for execution')
-        select_sets = select_from_db(table_name=ValuesSetting.__tablename__, where_equals={'id': set_id})
+        select_sets = select_from_db(
+            table_name=ValuesSetting.__tablename__, where_equals={'id': set_id}, model=SettingProcess)
         if select_sets:
             info(f'setting selected')
-            return [SettingProcess(**s) for s in select_sets].pop()
+            return select_sets.pop()
         else:
             warning('setting unavailable')
             pass
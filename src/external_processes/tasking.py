@@ -1,6 +1,7 @@
 from src.external_apis.drive_control import DriverExecuteError
 from src.internal_processes.controlling import InvalidSettingRetry
 from src.external_processes.tasking_verify import TaskingVerify
+from src.internal_apis.database_query import unit_of_work
 from logging import info, warning
 from time import time
 
@@ -50,12 +51,14 @@ class TaskingRunning(TaskingProcess):
     def run_task(self):
         info('process running task')
         if self.task.status == 'running':
-            try:
-                self.task_process()
-            except (InvalidSettingRetry, DriverExecuteError) as ex:
-                warning(f'task process exception {ex}')
-                self.drive_error_task()
+            with unit_of_work:
+                try:
+                    self.task_process()
+                except (InvalidSettingRetry, DriverExecuteError) as ex:
+                    warning(f'task process exception {ex}')
+                    self.drive_error_task()
 
 
 def perform_task(task_id: str):
-    TaskingRunning(task_id=task_id).run_task()
+    with unit_of_work:
+        TaskingRunning(task_id=task_id).run_task()
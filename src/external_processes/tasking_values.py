@@ -1,10 +1,12 @@
 from src.internal_apis.models import ValuesTasking
 from src.internal_apis.database_query import select_from_db
+from src.internal_apis.selections import processed_task_selection
 from src.internal_processes.controlling import ControllingTasking
 from src.internal_processes.reading import ReadingTasking
 from src.internal_processes.checking import CheckingTasking
+from concurrent.futures import ThreadPoolExecutor
 from logging import info
-# from time import time
+from time import monotonic
 from typing import Union
 from decimal import Decimal
 
@@ -14,19 +16,53 @@ class TaskingAttributes:
     checking: CheckingTasking
     controlling: ControllingTasking
     reading: ReadingTasking
+    load_timings: dict[str, float]
     COOLING_DELTA: int = 5
+    LOAD_CONCURRENTLY: bool = True
 
     @staticmethod
     def get_processed_task(task_id: str) -> ValuesTasking:
         info('fetching processed task')
-        return [ValuesTasking(**s) for s in select_from_db(
-            table_name=ValuesTasking.__tablename__, where_equals={'id': task_id})].pop()
+        return select_from_db(**processed_task_selection(task_id)).pop()
 
-    def __init__(self, task_id: str):
-        self.task = self.get_processed_task(task_id)
-        self.checking = CheckingTasking(self.task.id, self.task.start)
-        self.controlling = ControllingTasking(self.task.id)
-        self.reading = ReadingTasking(self.task.id, self.checking.container_name)
+    def _timed(self, step: str, action, *args):
+        step_start = monotonic()
+        result = action(*args)
+        self.load_timings[step] = round(monotonic() - step_start, 3)
+        return result
+
+    def _load_sequentially(self, task_id: str):
+        self.task = self._timed('task', self.get_processed_task, task_id)
+        container_name = self._timed('container', CheckingTasking.related_container_name, task_id)
+        self.controlling = self._timed('controls', ControllingTasking, task_id)
+        self.checking = self._timed('checks', CheckingTasking, task_id, self.task.start, container_name)
+        self.reading = self._timed('reads', ReadingTasking, task_id, container_name, self.task.start)
+
+    def _load_concurrently(self, task_id: str):
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            task = executor.submit(self._timed, 'task', self.get_processed_task, task_id)
+            container = executor.submit(self._timed, 'container', CheckingTasking.related_container_name, task_id)
+            controlling = executor.submit(self._timed, 'controls', ControllingTasking, task_id)
+            self.task, container_name = task.result(), container.result()
+            checking = executor.submit(
+                self._timed, 'checks', CheckingTasking, task_id, self.task.start, container_name)
+            reading = executor.submit(self._timed, 'reads', ReadingTasking, task_id, container_name, self.task.start)
+            self.controlling, self.checking, self.reading = controlling.result(), checking.result(), reading.result()
+
+    def _log_load_timings(self, wall_time: float):
+        steps = ', '.join(f'{step} {seconds} s' for step, seconds in self.load_timings.items())
+        info(f'values load steps: {steps}')
+        info(f'values load steps sum: {sum(self.load_timings.values()):.3f} s, wall: {wall_time:.3f} s')
+
+    def __init__(self, task_id: str, load_concurrently: Union[None, bool] = None):
+        self.load_timings = {}
+        load_start = monotonic()
+        concurrently = self.LOAD_CONCURRENTLY if load_concurrently is None else load_concurrently
+        if concurrently:
+            self._load_concurrently(task_id)
+        else:
+            self._load_sequentially(task_id)
+        self._log_load_timings(monotonic() - load_start)
         self.task.use_decimal_temperatures()
 
     @staticmethod
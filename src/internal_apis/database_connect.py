@@ -1,10 +1,14 @@
-from psycopg2 import connect, OperationalError, InternalError
+from psycopg2 import connect, OperationalError, InternalError, InterfaceError
 from pathlib import Path
 from dotenv import dotenv_values
 from logging import info, warning
-from psycopg2.extensions import cursor, connection
-from time import sleep
+from psycopg2.extensions import cursor, connection, TRANSACTION_STATUS_IDLE
+from contextlib import contextmanager
+from threading import Condition
+from atexit import register
+from time import sleep, monotonic
 from functools import wraps
+from typing import Iterator, Union
 
 
 dotenv_path = Path(__file__).parent.parent.parent / '.env'
@@ -20,35 +24,163 @@ db_config = {
 
 
 CONNECTION_RETRIES = 5
+POOL_SIZE = int(env_values.get('DB_POOL_SIZE') or 4)
+# idle seconds after which a pooled connection is pinged before reuse
+POOL_PING_AFTER = 30
 
 
-def connection_generator(retries: int = CONNECTION_RETRIES):
-    while retries:
+def _connect(retries: int = CONNECTION_RETRIES) -> connection:
+    attempt = 1
+    while attempt <= retries:
         try:
-            consecutive_connection = connect(**db_config)
-            yield consecutive_connection
+            return connect(**db_config)
         except OperationalError as e:
-            retries -= 1
             warning(f"db error connecting to database: {e}")
             sleep(1)
-            info(f'db connection count {CONNECTION_RETRIES - retries + 1}')
-            continue
-    else:
-        raise ConnectionError("Database connection error")
+            attempt += 1
+            info(f'db connection count {attempt}')
+    raise ConnectionError("Database connection error")
 
 
-connection_gen = connection_generator()
+class ConnectionPool:
+    size: int
+    hits: int
+    connects: int
+    discards: int
+    waits: int
+    wait_time: float
 
+    def __init__(self, size: int = POOL_SIZE):
+        self.size = size
+        self._idle: list[tuple[connection, float]] = []
+        self._in_use = 0
+        self._condition = Condition()
+        self._prepared: dict[int, set[str]] = {}
+        self.hits = 0
+        self.connects = 0
+        self.discards = 0
+        self.waits = 0
+        self.wait_time = 0.0
 
-def db_connection_and_cursor() -> tuple[connection, cursor]:
-    for next_db_connection in connection_gen:
-        next_db_cursor = next_db_connection.cursor()
-        return next_db_connection, next_db_cursor
+    @staticmethod
+    def _is_healthy(pooled: connection, idle_since: float) -> bool:
+        if pooled.closed:
+            return False
+        if monotonic() - idle_since < POOL_PING_AFTER:
+            return True
+        try:
+            with pooled.cursor() as ping_cursor:
+                ping_cursor.execute('SELECT 1')
+            pooled.rollback()
+            return True
+        except (OperationalError, InterfaceError):
+            return False
+
+    def _close(self, pooled: connection):
+        self._prepared.pop(id(pooled), None)
+        try:
+            pooled.close()
+        except (OperationalError, InterfaceError):
+            pass
+
+    def _reserve(self) -> Union[None, tuple[connection, float]]:
+        with self._condition:
+            if not self._idle and self._in_use >= self.size:
+                self.waits += 1
+                wait_start = monotonic()
+                while not self._idle and self._in_use >= self.size:
+                    self._condition.wait()
+                self.wait_time += monotonic() - wait_start
+            self._in_use += 1
+            return self._idle.pop() if self._idle else None
+
+    def _release(self):
+        with self._condition:
+            self._in_use -= 1
+            self._condition.notify()
+
+    def get(self) -> connection:
+        idle = self._reserve()
+        if idle:
+            pooled, idle_since = idle
+            if self._is_healthy(pooled, idle_since):
+                with self._condition:
+                    self.hits += 1
+                return pooled
+            warning('db pool discarding stale connection')
+            self._close(pooled)
+            with self._condition:
+                self.discards += 1
+        try:
+            new_connection = _connect()
+        except ConnectionError:
+            self._release()
+            raise
+        with self._condition:
+            self.connects += 1
+        return new_connection
+
+    def put(self, pooled: connection, discard: bool = False):
+        if not discard and not pooled.closed and pooled.get_transaction_status() != TRANSACTION_STATUS_IDLE:
+            try:
+                pooled.rollback()
+            except (OperationalError, InterfaceError):
+                discard = True
+        with self._condition:
+            self._in_use -= 1
+            if discard or pooled.closed:
+                self.discards += 1
+                self._close(pooled)
+            else:
+                self._idle.append((pooled, monotonic()))
+            self._condition.notify()
+
+    def prepared_statements(self, pooled: connection) -> set[str]:
+        with self._condition:
+            return self._prepared.setdefault(id(pooled), set())
+
+    def close_all(self):
+        with self._condition:
+            idle, self._idle = self._idle, []
+        info(f'db pool closing {len(idle)} connections')
+        for pooled, _ in idle:
+            self._close(pooled)
+
+    def stats(self) -> dict:
+        with self._condition:
+            return {
+                'size': self.size,
+                'idle': len(self._idle),
+                'in_use': self._in_use,
+                'hits': self.hits,
+                'connects': self.connects,
+                'discards': self.discards,
+                'waits': self.waits,
+                'wait_time': round(self.wait_time, 3)
+            }
+
+
+connection_pool = ConnectionPool()
+register(connection_pool.close_all)
+
+
+@contextmanager
+def db_connection_and_cursor() -> Iterator[tuple[connection, cursor]]:
+    pooled_connection = connection_pool.get()
+    broken = False
+    try:
+        with pooled_connection.cursor() as pooled_cursor:
+            yield pooled_connection, pooled_cursor
+    except (OperationalError, InterfaceError):
+        broken = True
+        raise
+    finally:
+        connection_pool.put(pooled_connection, discard=broken)
 
 
 def db_retry_on_exception(
         max_retries: int = CONNECTION_RETRIES,
-        exceptions=(OperationalError, InternalError,)):
+        exceptions=(OperationalError, InternalError, InterfaceError,)):
     def decorator(func):
         @wraps(func)
         def wrapper(*args, **kwargs):
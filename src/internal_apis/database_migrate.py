@@ -0,0 +1,335 @@
+from src.internal_apis.database_connect import db_connection_and_cursor, db_retry_on_exception
+from src.internal_apis.database_statement import Statement
+from src.internal_apis.database_query import select_query, related_query, update_columns_query
+from src.internal_apis.models import data_objects, relations, primary_key, ThingThermometer
+from src.internal_apis.selections import (
+    processed_task_selection, container_name_selection, container_checks_selection, controls_selection,
+    thermometers_selection, past_reads_selection, PAGE_INDEX_COLUMNS)
+from psycopg2.extensions import cursor
+from dataclasses import fields
+from datetime import datetime, timezone
+from decimal import Decimal
+from json import loads
+from typing import Union, get_args
+from logging import info, warning
+
+
+# tables estimated beyond this row count must not be read sequentially on the tasking path
+LARGE_TABLE_ROWS = 10000
+PARTITION_MONTHS_AHEAD = 2
+
+
+class SequentialScanError(Exception):
+    def __init__(self, message):
+        warning('migrate sequential scan detected')
+        self.message = message
+        super().__init__(self.message)
+
+
+def _column_type(annotation) -> tuple[str, bool]:
+    options = get_args(annotation) or (annotation,)
+    nullable = type(None) in options
+    if str in options:
+        return 'TEXT', nullable
+    elif Decimal in options:
+        return 'NUMERIC', nullable
+    elif int in options:
+        return 'BIGINT', nullable
+    raise TypeError(f'No column type for {annotation}')
+
+
+def _pair_relation(model: type):
+    return next((relation for relation in relations if relation.pair is model), None)
+
+
+def partition_key(model: type) -> Union[None, str]:
+    return getattr(model, '__partitionkey__', None)
+
+
+def _primary_key_columns(model: type) -> tuple:
+    relation = _pair_relation(model)
+    if relation:
+        return relation.owner_key, relation.target_key
+    declared = getattr(model, '__primarykey__', 'id')
+    if isinstance(declared, tuple):
+        return declared
+    # unique constraints on a partitioned table must contain the partition key
+    return (declared, partition_key(model)) if partition_key(model) else (declared,)
+
+
+def _column_definitions(model: type, constrained: bool = True) -> list[str]:
+    definitions = []
+    for model_field in fields(model):
+        column_type, nullable = _column_type(model_field.type)
+        not_null = '' if nullable or not constrained else ' NOT NULL'
+        definitions.append(f'{model_field.name} {column_type}{not_null}')
+    return definitions
+
+
+def _foreign_keys(model: type) -> list[str]:
+    relation = _pair_relation(model)
+    if not relation:
+        return []
+    return [
+        f'FOREIGN KEY ({key}) REFERENCES {referenced.__tablename__} '
+        f'({primary_key(referenced)}) ON DELETE CASCADE'
+        for key, referenced in ((relation.owner_key, relation.owner), (relation.target_key, relation.target))
+        if not partition_key(referenced)]
+
+
+def create_table_statement(model: type, table_name: Union[None, str] = None) -> str:
+    definitions = _column_definitions(model)
+    definitions.append(f'PRIMARY KEY ({", ".join(_primary_key_columns(model))})')
+    definitions += _foreign_keys(model)
+    joined_definitions = ',\n    '.join(definitions)
+    partitioning = f' PARTITION BY RANGE ({partition_key(model)})' if partition_key(model) else ''
+    table_name = table_name or model.__tablename__
+    return f'CREATE TABLE IF NOT EXISTS {table_name} (\n    {joined_definitions}\n){partitioning}'
+
+
+def add_columns_statements(model: type) -> list[str]:
+    # columns added to populated tables cannot be NOT NULL without a default
+    return [
+        f'ALTER TABLE {model.__tablename__} ADD COLUMN IF NOT EXISTS {definition}'
+        for definition in _column_definitions(model, constrained=False)]
+
+
+def _index_columns(model: type) -> list[tuple]:
+    indexes = list(getattr(model, '__indexes__', ()))
+    relation = _pair_relation(model)
+    if relation:
+        # primary key serves owner lookups, this one serves lookups by target
+        indexes.append((relation.target_key, relation.owner_key))
+    return indexes
+
+
+def create_index_statements(model: type) -> list[str]:
+    table_name = model.__tablename__
+    return [
+        f'CREATE INDEX IF NOT EXISTS ix_{table_name.lower()}_{"_".join(columns)} '
+        f'ON {table_name} ({", ".join(columns)})'
+        for columns in _index_columns(model)]
+
+
+def schema_statements() -> list[str]:
+    # referenced tables first, data_objects lists them in clearing order
+    created_objects = data_objects[::-1]
+    statements = [create_table_statement(model) for model in created_objects]
+    for model in created_objects:
+        statements += add_columns_statements(model)
+        statements += create_index_statements(model)
+    return statements
+
+
+def _month_start(year: int, month: int) -> int:
+    return int(datetime(year, month, 1, tzinfo=timezone.utc).timestamp())
+
+
+def _next_month(year: int, month: int) -> tuple[int, int]:
+    return (year + 1, 1) if month == 12 else (year, month + 1)
+
+
+def partition_name(table_name: str, year: int, month: int) -> str:
+    return f'{table_name.lower()}_p{year}{month:02d}'
+
+
+def partition_month_end(partition: str) -> Union[None, int]:
+    suffix = partition.rsplit('_p', 1)[-1]
+    if len(suffix) != 6 or not suffix.isdigit():
+        return None
+    return _month_start(*_next_month(int(suffix[:4]), int(suffix[4:])))
+
+
+def partition_ranges(
+        table_name: str, months_ahead: int = PARTITION_MONTHS_AHEAD, since: Union[None, int] = None
+) -> list[tuple[str, int, int]]:
+    # the current month and the months ahead, from the month of since when given
+    now = datetime.now(timezone.utc)
+    first = datetime.fromtimestamp(min(since, int(now.timestamp())), timezone.utc) if since is not None else now
+    year, month = first.year, first.month
+    months = (now.year - year) * 12 + now.month - month + months_ahead + 1
+    ranges = []
+    for _ in range(months):
+        next_year, next_month = _next_month(year, month)
+        ranges.append((partition_name(table_name, year, month), _month_start(year, month),
+                       _month_start(next_year, next_month)))
+        year, month = next_year, next_month
+    return ranges
+
+
+def partition_statements(model: type, partition: str, range_start: int, range_end: int) -> list[str]:
+    # rows of the month that already landed in the default partition move before the range is attached,
+    # attaching over them would fail
+    table_name = model.__tablename__
+    default_partition = f'{table_name.lower()}_default'
+    key = partition_key(model)
+    return [
+        f'CREATE TABLE {partition} (LIKE {table_name} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)',
+        f'WITH moved AS (DELETE FROM {default_partition} WHERE {key} >= {range_start} AND {key} < {range_end} '
+        f'RETURNING *) INSERT INTO {partition} SELECT * FROM moved',
+        f'ALTER TABLE {table_name} ATTACH PARTITION {partition} FOR VALUES FROM ({range_start}) TO ({range_end})',
+    ]
+
+
+def partitioned_tables(migrate_cursor: cursor) -> set[str]:
+    migrate_cursor.execute('SELECT partrelid::regclass::text FROM pg_partitioned_table')
+    return {row[0].strip('"').lower() for row in migrate_cursor.fetchall()}
+
+
+def partition_parents(migrate_cursor: cursor) -> dict[str, str]:
+    migrate_cursor.execute(
+        'SELECT child.relname, parent.relname FROM pg_inherits '
+        'JOIN pg_class child ON child.oid = pg_inherits.inhrelid '
+        'JOIN pg_class parent ON parent.oid = pg_inherits.inhparent '
+        "WHERE child.relkind = 'r'")
+    return dict(migrate_cursor.fetchall())
+
+
+def ensure_partitions(migrate_cursor: cursor, months_ahead: int = PARTITION_MONTHS_AHEAD):
+    partitioned = partitioned_tables(migrate_cursor)
+    existing = set(partition_parents(migrate_cursor))
+    for model in data_objects:
+        if not partition_key(model):
+            continue
+        table_name = model.__tablename__
+        if table_name.lower() not in partitioned:
+            warning(f'migrate {table_name} exists unpartitioned, partitions skipped until migrate converts it')
+            continue
+        migrate_cursor.execute(
+            f'CREATE TABLE IF NOT EXISTS {table_name.lower()}_default PARTITION OF {table_name} DEFAULT')
+        for partition, range_start, range_end in partition_ranges(table_name, months_ahead):
+            if partition in existing:
+                continue
+            info(f'migrate creating partition {partition}')
+            create_partition, move_rows, attach_partition = partition_statements(
+                model, partition, range_start, range_end)
+            migrate_cursor.execute(create_partition)
+            migrate_cursor.execute(move_rows)
+            if migrate_cursor.rowcount:
+                info(f'migrate moved {migrate_cursor.rowcount} rows from the default partition into {partition}')
+            migrate_cursor.execute(attach_partition)
+
+
+def _is_unpartitioned(migrate_cursor: cursor, table_name: str) -> bool:
+    migrate_cursor.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)", (table_name.lower(),))
+    row = migrate_cursor.fetchone()
+    return row is not None and row[0] == 'r'
+
+
+def convert_to_partitioned(migrate_cursor: cursor, model: type, months_ahead: int = PARTITION_MONTHS_AHEAD):
+    # a partitioned copy is filled month by month and takes over the name, all in the caller's transaction
+    table_name = model.__tablename__.lower()
+    converted = f'{table_name}_partitioned'
+    key = partition_key(model)
+    columns = ', '.join(model.__columns__)
+    migrate_cursor.execute(f'SELECT min({key}), count(*) FROM {table_name}')
+    since, rows = migrate_cursor.fetchone()
+    info(f'migrate converting {table_name} with {rows} rows to monthly partitions')
+    migrate_cursor.execute(create_table_statement(model, converted))
+    migrate_cursor.execute(f'CREATE TABLE {table_name}_default PARTITION OF {converted} DEFAULT')
+    for partition, range_start, range_end in partition_ranges(table_name, months_ahead, since):
+        migrate_cursor.execute(
+            f'CREATE TABLE {partition} PARTITION OF {converted} FOR VALUES FROM ({range_start}) TO ({range_end})')
+        migrate_cursor.execute(
+            f'INSERT INTO {converted} ({columns}) SELECT {columns} FROM {table_name} '
+            f'WHERE {key} >= {range_start} AND {key} < {range_end}')
+        info(f'migrate copied {migrate_cursor.rowcount} rows into {partition}')
+    last_end = partition_ranges(table_name, months_ahead)[-1][2]
+    migrate_cursor.execute(
+        f'INSERT INTO {converted} ({columns}) SELECT {columns} FROM {table_name} WHERE {key} >= {last_end}')
+    migrate_cursor.execute(f'SELECT count(*) FROM {converted}')
+    copied = migrate_cursor.fetchone()[0]
+    if copied != rows:
+        raise RuntimeError(f'migrate copied {copied} of {rows} rows of {table_name}, conversion rolled back')
+    # foreign keys into the old table go with it, partitioned tables are not referenced
+    migrate_cursor.execute(f'DROP TABLE {table_name} CASCADE')
+    migrate_cursor.execute(f'ALTER TABLE {converted} RENAME TO {table_name}')
+    migrate_cursor.execute(f'ALTER TABLE {table_name} RENAME CONSTRAINT {converted}_pkey TO {table_name}_pkey')
+    for statement in create_index_statements(model):
+        migrate_cursor.execute(statement)
+
+
+def convert_unpartitioned(migrate_cursor: cursor):
+    for model in data_objects:
+        if partition_key(model) and _is_unpartitioned(migrate_cursor, model.__tablename__):
+            convert_to_partitioned(migrate_cursor, model)
+
+
+@db_retry_on_exception()
+def maintain_partitions():
+    # a transaction of its own, a failing upkeep leaves the caller's work committed
+    info('migrate maintaining partitions')
+    with db_connection_and_cursor() as (partition_connection, partition_cursor):
+        ensure_partitions(partition_cursor)
+        partition_connection.commit()
+
+
+@db_retry_on_exception()
+def apply_schema():
+    info('migrate applying schema')
+    with db_connection_and_cursor() as (migrate_connection, migrate_cursor):
+        for statement in schema_statements():
+            migrate_cursor.execute(statement)
+        convert_unpartitioned(migrate_cursor)
+        ensure_partitions(migrate_cursor)
+        migrate_connection.commit()
+
+
+def tasking_statements() -> list[tuple[Statement, list]]:
+    # the selections the tasking path runs, with placeholder values, and the page index update of thermometers
+    task_id, container_name, start = '', '', 0
+    return [
+        select_query(**processed_task_selection(task_id)),
+        select_query(**container_name_selection(task_id)),
+        select_query(**container_checks_selection(container_name, start)),
+        related_query(**controls_selection(task_id)),
+        related_query(**thermometers_selection(container_name)),
+        related_query(**past_reads_selection(task_id, start)),
+        (update_columns_query(ThingThermometer, PAGE_INDEX_COLUMNS), [None] * (len(PAGE_INDEX_COLUMNS) + 1)),
+    ]
+
+
+def _large_tables(plan_cursor: cursor, min_rows: int) -> set[str]:
+    # a partitioned parent keeps no row estimate of its own, its partitions are summed instead
+    table_names = [model.__tablename__.lower() for model in data_objects]
+    plan_cursor.execute(
+        'SELECT coalesce(parent.relname, child.relname), sum(greatest(child.reltuples, 0)) FROM pg_class child '
+        'LEFT JOIN pg_inherits ON pg_inherits.inhrelid = child.oid '
+        'LEFT JOIN pg_class parent ON parent.oid = pg_inherits.inhparent '
+        "WHERE child.relkind = 'r' AND coalesce(parent.relname, child.relname) = ANY(%s) "
+        'GROUP BY 1 HAVING sum(greatest(child.reltuples, 0)) >= %s', (table_names, min_rows))
+    return {row[0] for row in plan_cursor.fetchall()}
+
+
+def _sequential_scans(plan: dict, parents: dict[str, str]) -> list[str]:
+    # partitions are reported under their parent table
+    scanned = []
+    if plan.get('Node Type') == 'Seq Scan':
+        scanned.append(parents.get(plan['Relation Name'], plan['Relation Name']))
+    for sub_plan in plan.get('Plans', []):
+        scanned += _sequential_scans(sub_plan, parents)
+    return scanned
+
+
+@db_retry_on_exception()
+def verify_query_plans(min_rows: int = LARGE_TABLE_ROWS):
+    info('migrate verifying tasking query plans')
+    offending = []
+    with db_connection_and_cursor() as (plan_connection, plan_cursor):
+        large_tables = _large_tables(plan_cursor, min_rows)
+        parents = partition_parents(plan_cursor)
+        for statement, parameters in tasking_statements():
+            plan_cursor.execute(f'EXPLAIN (FORMAT JSON) {statement.text}', parameters)
+            explained = plan_cursor.fetchone()[0]
+            explained = loads(explained) if isinstance(explained, str) else explained
+            scanned = [table for table in _sequential_scans(explained[0]['Plan'], parents) if table in large_tables]
+            if scanned:
+                offending.append(f'{statement.text} -> {", ".join(scanned)}')
+    if offending:
+        raise SequentialScanError('; '.join(offending))
+    info('migrate tasking query plans use indexes')
+
+
+def migrate_database():
+    apply_schema()
+    verify_query_plans()
@@ -1,14 +1,61 @@
-from src.internal_apis.database_connect import db_connection_and_cursor, db_retry_on_exception
-from typing import Union
-from logging import info
-# from psycopg2.extras import execute_values
-#
-#
-# def insert_many_notes(cur):
-#     execute_values(
-#         cur,
-#         "INSERT INTO test (id, v1, v2) VALUES %s",
-#         [(1, 2, 3), (4, 5, 6), (7, 8, 9)])
+from src.internal_apis.database_connect import db_connection_and_cursor, db_retry_on_exception, env_values
+from src.internal_apis.database_statement import (
+    Statement, select_statement, related_statement, insert_statement, update_statement, delete_statement,
+    execute_statement)
+from src.internal_apis.models import Relation, primary_key, as_row
+from psycopg2.extras import execute_values
+from psycopg2.extensions import cursor
+from csv import writer, QUOTE_NONNUMERIC
+from io import StringIO
+from time import monotonic
+from threading import local
+from uuid import uuid4
+from contextlib import contextmanager
+from typing import Callable, Iterator, Union
+from logging import info, warning
+
+
+BULK_PAGE_SIZE = int(env_values.get('DB_BULK_PAGE_SIZE') or 100)
+BULK_COPY_THRESHOLD = int(env_values.get('DB_BULK_COPY_THRESHOLD') or 500)
+STREAM_ITERSIZE = int(env_values.get('DB_STREAM_ITERSIZE') or 2000)
+
+
+def _predicates(
+        where_equals: Union[dict[str, str], None] = None,
+        where_in: Union[dict[str, list], None] = None,
+        where: Union[list[tuple[str, str, object]], None] = None
+) -> tuple[tuple, list]:
+    shape, parameters = [], []
+    for column, value in (where_equals or {}).items():
+        shape.append((column, '='))
+        parameters.append(value)
+    for column, values in (where_in or {}).items():
+        shape.append((column, 'in'))
+        parameters.append(list(values))
+    for column, operator, value in (where or []):
+        shape.append((column, operator))
+        parameters.append(list(value) if operator == 'in' else value)
+    return tuple(shape), parameters
+
+
+def select_query(
+        table_name: str,
+        columns: Union[list, None] = None,
+        where_equals: Union[dict[str, str], None] = None,
+        where_in: Union[dict[str, list], None] = None,
+        where: Union[list[tuple[str, str, object]], None] = None,
+        order_by: Union[dict[str, str], None] = None,
+        limit: Union[int, None] = None,
+        model: Union[type, None] = None
+) -> tuple[Statement, list]:
+    predicates, parameters = _predicates(where_equals, where_in, where)
+    if model:
+        columns = model.__columns__
+    statement = select_statement(
+        table_name, tuple(columns or ()), predicates, tuple((order_by or {}).items()), limit is not None)
+    if limit is not None:
+        parameters.append(limit)
+    return statement, parameters
 
 
 @db_retry_on_exception()
@@ -17,33 +64,20 @@ def select_from_db(
         columns: Union[list, None] = None,
         where_equals: Union[dict[str, str], None] = None,
         where_in: Union[dict[str, list], None] = None,
-        keys: bool = True
+        keys: bool = True,
+        where: Union[list[tuple[str, str, object]], None] = None,
+        order_by: Union[dict[str, str], None] = None,
+        limit: Union[int, None] = None,
+        model: Union[type, None] = None
 ) -> Union[list, list[dict]]:
     info(f'db select from {table_name}')
-
-    def _enum_cols(select_columns: list):
-        if not select_columns:
-            select_columns = '*'
-        else:
-            select_columns = str(select_columns)[1:-1].replace("'", '')
-        return select_columns
-
-    def _where_clause() -> str:
-        if where_equals:
-            return f" WHERE {list(where_equals.keys())[0]} = '{list(where_equals.values())[0]}'"
-        elif where_in:
-            id_listing = str(tuple(list(where_in.values())[0])).replace(",)", ")")
-            return f" WHERE {list(where_in.keys())[0]} IN {id_listing}"
-        else:
-            return ''
-
-    select_query = f"""SELECT {_enum_cols(columns)} FROM {table_name}{_where_clause()}"""
-    select_connection, select_cursor = db_connection_and_cursor()
-
-    with select_cursor:
-        select_cursor.execute(select_query)
+    statement, parameters = select_query(table_name, columns, where_equals, where_in, where, order_by, limit, model)
+    with db_connection_and_cursor() as (select_connection, select_cursor):
+        execute_statement(select_cursor, statement, parameters)
         values = select_cursor.fetchall()
-        if not keys:
+        if model:
+            return_values = [model(*row) for row in values]
+        elif not keys:
             return_values = [val[0] for val in values]
         elif keys:
             names = [description[0] for description in select_cursor.description]
@@ -52,66 +86,227 @@ def select_from_db(
     return return_values
 
 
+def stream_from_db(
+        model: type,
+        where_equals: Union[dict[str, str], None] = None,
+        where_in: Union[dict[str, list], None] = None,
+        where: Union[list[tuple[str, str, object]], None] = None,
+        order_by: Union[dict[str, str], None] = None,
+        limit: Union[int, None] = None,
+        itersize: int = STREAM_ITERSIZE
+) -> Iterator:
+    table_name = model.__tablename__
+    info(f'db streaming from {table_name}')
+    statement, parameters = select_query(
+        table_name, where_equals=where_equals, where_in=where_in, where=where, order_by=order_by, limit=limit,
+        model=model)
+    with db_connection_and_cursor() as (stream_connection, _):
+        with stream_connection.cursor(name=f'stream_{uuid4().hex}') as stream_cursor:
+            stream_cursor.itersize = itersize
+            stream_cursor.execute(statement.text, parameters)
+            for row in stream_cursor:
+                yield model(*row)
+
+
+def related_query(
+        relation: Relation,
+        owner_id: str,
+        since: Union[int, None] = None,
+        order_by: Union[dict[str, str], None] = None
+) -> tuple[Statement, list]:
+    window_column = relation.window if since is not None else None
+    statement = related_statement(
+        relation.target.__tablename__, primary_key(relation.target), relation.pair.__tablename__,
+        relation.target_key, relation.owner_key, window_column, tuple((order_by or {}).items()),
+        relation.target.__columns__)
+    parameters = [owner_id] if window_column is None else [owner_id, since]
+    return statement, parameters
+
+
+@db_retry_on_exception()
+def select_related(
+        relation: Relation,
+        owner_id: str,
+        since: Union[int, None] = None,
+        order_by: Union[dict[str, str], None] = None
+) -> list:
+    info(f'db select {relation.target.__tablename__} related by {relation.pair.__tablename__}')
+    statement, parameters = related_query(relation, owner_id, since, order_by)
+    with db_connection_and_cursor() as (select_connection, select_cursor):
+        execute_statement(select_cursor, statement, parameters)
+        return [relation.target(*row) for row in select_cursor.fetchall()]
+
+
+def _bulk_method(rows_count: int) -> str:
+    return 'copy' if rows_count >= BULK_COPY_THRESHOLD else 'values'
+
+
+class _CopyNull(int):
+    # numeric to the csv writer, so the marker is written unquoted and read back as NULL
+    def __str__(self):
+        return r'\N'
+
+    __repr__ = __str__
+
+
+COPY_NULL = _CopyNull()
+
+
+def _copy_rows(copy_cursor: cursor, table_name: str, value_keys: tuple, insert_data: list):
+    # strings are always quoted, so an empty string stays an empty string and only the bare marker is NULL
+    buffer = StringIO()
+    writer(buffer, quoting=QUOTE_NONNUMERIC).writerows(
+        [COPY_NULL if value is None else value for value in row] for row in insert_data)
+    buffer.seek(0)
+    copy_query = f"""COPY {table_name} ({', '.join(value_keys)}) FROM STDIN WITH (FORMAT csv, NULL '\\N')"""
+    copy_cursor.copy_expert(copy_query, buffer)
+
+
+class UnitOfWork(local):
+    # every thread holds its own unit, workers started during a run write outside of it
+    _marks: list[int]
+    _pending: list[Callable[[cursor], None]]
+
+    def __init__(self):
+        self._marks = []
+        self._pending = []
+
+    @property
+    def active(self) -> bool:
+        return bool(self._marks)
+
+    def add(self, operation: Callable[[cursor], None]):
+        self._pending.append(operation)
+
+    def __enter__(self):
+        self._marks.append(len(self._pending))
+        return self
+
+    @contextmanager
+    def deferred(self) -> Iterator[list[Callable[[cursor], None]]]:
+        # the block's writes are handed to the caller instead of flushed, see commit_writes
+        writes = []
+        with self:
+            yield writes
+            mark = self._marks[-1]
+            writes.extend(self._pending[mark:])
+            del self._pending[mark:]
+
+    def __exit__(self, exc_type, *_):
+        # a failed run leaves none of its writes, the enclosing unit keeps what was queued before it
+        mark = self._marks.pop()
+        if exc_type is not None:
+            if len(self._pending) > mark:
+                warning(f'db unit of work discarding {len(self._pending) - mark} writes of a failed run')
+            del self._pending[mark:]
+            return
+        if self._marks:
+            return
+        pending, self._pending = self._pending, []
+        if pending:
+            info(f'db unit of work flushing {len(pending)} writes')
+            _execute_in_transaction(pending)
+
+
+unit_of_work = UnitOfWork()
+
+
 @db_retry_on_exception()
-def insert_multiple_objects_into_db(data_objects: list):
+def _execute_in_transaction(operations: list[Callable[[cursor], None]]):
+    with db_connection_and_cursor() as (write_connection, write_cursor):
+        for operation in operations:
+            operation(write_cursor)
+        write_connection.commit()
+
+
+def commit_writes(operations: list[Callable[[cursor], None]]):
+    if operations:
+        info(f'db committing {len(operations)} deferred writes')
+        _execute_in_transaction(operations)
+
+
+def _write(operation: Callable[[cursor], None]):
+    if unit_of_work.active:
+        unit_of_work.add(operation)
+    else:
+        _execute_in_transaction([operation])
+
+
+def insert_multiple_objects_into_db(data_objects: list, method: Union[None, str] = None, page_size: int = BULK_PAGE_SIZE):
+    if not data_objects:
+        return
     object_zero = data_objects[0]
     table_name = object_zero.__tablename__
+    method = method or _bulk_method(len(data_objects))
     info(f'db inserting multiple objects {table_name}')
-    value_keys = tuple(object_zero.__annotations__.keys())
-    insert_data = [[row.__dict__[key] for key in value_keys] for row in data_objects]
-    insert_query = f"""
-        INSERT INTO {table_name} {str(value_keys).replace("'", "")} 
-        VALUES ({str('%s, '*len(value_keys))[:-2]})"""
-    insert_connection, insert_cursor = db_connection_and_cursor()
-    with insert_cursor:
-        insert_cursor.executemany(insert_query, insert_data)
-        insert_connection.commit()
+    value_keys = object_zero.__columns__
+    insert_data = [as_row(row) for row in data_objects]
+    columns = ', '.join(value_keys)
+
+    def _insert(insert_cursor: cursor):
+        insert_start = monotonic()
+        if method == 'copy':
+            _copy_rows(insert_cursor, table_name, value_keys, insert_data)
+        elif method == 'values':
+            insert_query = f"""INSERT INTO {table_name} ({columns}) VALUES %s"""
+            execute_values(insert_cursor, insert_query, insert_data, page_size=page_size)
+        else:
+            insert_cursor.executemany(insert_statement(table_name, value_keys).text, insert_data)
+        info(f'db inserted {len(insert_data)} rows by {method} in {monotonic() - insert_start:.3f} s')
+
+    _write(_insert)
 
 
-@db_retry_on_exception()
 def insert_one_object_into_db(data_object: object):
     table_name = data_object.__tablename__
     info(f'db inserting object {table_name}')
-    value_keys = tuple(data_object.__annotations__.keys())
-    insert_data = [data_object.__dict__[key] for key in value_keys]
-    insert_query = f"""
-        INSERT INTO {table_name} {str(value_keys).replace("'", "")} 
-        VALUES ({str('%s, '*len(value_keys))[:-2]})"""
-    insert_connection, insert_cursor = db_connection_and_cursor()
-    with insert_cursor:
-        insert_cursor.execute(insert_query, insert_data)
-        insert_connection.commit()
+    value_keys = data_object.__columns__
+    insert_data = as_row(data_object)
+    statement = insert_statement(table_name, value_keys)
+    _write(lambda insert_cursor: execute_statement(insert_cursor, statement, insert_data))
 
 
-@db_retry_on_exception()
 def clear_table(table_name: str):
     info(f'db clearing table {table_name}')
-    delete_query = f"""DELETE FROM {table_name}"""
-    delete_connection, delete_cursor = db_connection_and_cursor()
-    with delete_cursor:
-        delete_cursor.execute(delete_query)
-        delete_connection.commit()
+    statement = delete_statement(table_name)
+    _write(lambda delete_cursor: execute_statement(delete_cursor, statement))
+
+
+def truncate_tables(table_names: list[str]):
+    info(f'db truncating {len(table_names)} tables')
+    truncate_query = f"""TRUNCATE {', '.join(table_names)} RESTART IDENTITY"""
+    _write(lambda truncate_cursor: truncate_cursor.execute(truncate_query))
 
 
-@db_retry_on_exception()
 def update_status_in_db(update_object: object):
     info(f'db updating status to {update_object.status}')
-    insert_connection, insert_cursor = db_connection_and_cursor()
-    update_query = f"""
-        UPDATE {update_object.__tablename__} 
-        SET status='{update_object.status}' 
-        WHERE id='{update_object.id}'
-        """
-    with insert_cursor:
-        insert_cursor.execute(update_query)
-        insert_connection.commit()
+    statement = update_statement(update_object.__tablename__, ('status',), (('id', '='),))
+    parameters = [update_object.status, update_object.id]
+    _write(lambda update_cursor: execute_statement(update_cursor, statement, parameters))
+
+
+def update_columns_query(model: type, columns: tuple) -> Statement:
+    return update_statement(model.__tablename__, columns, ((primary_key(model), '='),))
+
+
+def update_columns_in_db(update_objects: list, columns: tuple):
+    if not update_objects:
+        return
+    model = type(update_objects[0])
+    info(f'db updating {len(update_objects)} objects {model.__tablename__}')
+    key = primary_key(model)
+    statement = update_columns_query(model, columns)
+    parameters = [[getattr(update_object, column) for column in columns + (key,)] for update_object in update_objects]
+
+    def _update(update_cursor: cursor):
+        for update_parameters in parameters:
+            execute_statement(update_cursor, statement, update_parameters)
+
+    _write(_update)
 
 
-@db_retry_on_exception()
 def delete_from_table(table_name: str, where: dict):
     info(f'db deleting from table {table_name} with a condition')
-    delete_connection, delete_cursor = db_connection_and_cursor()
-    delete_query = f"""DELETE FROM {table_name} WHERE {list(where.keys())[0]} = '{list(where.values())[0]}'"""
-    with delete_cursor:
-        delete_cursor.execute(delete_query)
-        delete_connection.commit()
+    predicates, parameters = _predicates(where_equals=where)
+    statement = delete_statement(table_name, predicates)
+    _write(lambda delete_cursor: execute_statement(delete_cursor, statement, parameters))
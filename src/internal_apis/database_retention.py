@@ -0,0 +1,94 @@
+from src.internal_apis.database_connect import db_connection_and_cursor, db_retry_on_exception, env_values
+from src.internal_apis.database_migrate import (
+    partition_key, partition_month_end, partitioned_tables, maintain_partitions)
+from src.internal_apis.models import ValuesReading, ValuesCheck, RollupReading, RollupCheck, PairTaskRead
+from psycopg2.extensions import cursor
+from time import time
+from logging import info
+
+
+RETENTION_DAYS = int(env_values.get('DB_RETENTION_DAYS') or 30)
+ROLLUP_BUCKET = int(env_values.get('DB_ROLLUP_BUCKET') or 3600)
+
+_NUMERIC = "NULLIF(regexp_replace({}, '[^0-9.-]', '', 'g'), '')::numeric"
+
+ROLLUP_READS = f"""
+    INSERT INTO {RollupReading.__tablename__} AS rollup (thermometer, bucket, reads, t_min, t_max, t_avg)
+    SELECT thermometer, db_time - db_time %% %(bucket)s, count(value), min(value), max(value), avg(value)
+    FROM (
+        SELECT thermometer, db_time, {_NUMERIC.format('temperature')} AS value
+        FROM {ValuesReading.__tablename__} WHERE db_time < %(cutoff)s
+    ) raw
+    GROUP BY 1, 2
+    ON CONFLICT (thermometer, bucket) DO UPDATE SET
+        t_min = LEAST(rollup.t_min, EXCLUDED.t_min),
+        t_max = GREATEST(rollup.t_max, EXCLUDED.t_max),
+        t_avg = coalesce(
+            (rollup.t_avg * rollup.reads + EXCLUDED.t_avg * EXCLUDED.reads) / NULLIF(rollup.reads + EXCLUDED.reads, 0),
+            rollup.t_avg, EXCLUDED.t_avg),
+        reads = rollup.reads + EXCLUDED.reads
+    """
+
+ROLLUP_CHECKS = f"""
+    INSERT INTO {RollupCheck.__tablename__} AS rollup
+        (container, bucket, checks, setpoint_min, setpoint_max, setpoint_avg)
+    SELECT container, timestamp - timestamp %% %(bucket)s, count(*), min(value), max(value), avg(value)
+    FROM (
+        SELECT container, timestamp, {_NUMERIC.format('read_setpoint')} AS value
+        FROM {ValuesCheck.__tablename__} WHERE timestamp < %(cutoff)s
+    ) raw
+    GROUP BY 1, 2
+    ON CONFLICT (container, bucket) DO UPDATE SET
+        setpoint_min = LEAST(rollup.setpoint_min, EXCLUDED.setpoint_min),
+        setpoint_max = GREATEST(rollup.setpoint_max, EXCLUDED.setpoint_max),
+        setpoint_avg = coalesce(
+            (rollup.setpoint_avg * rollup.checks + EXCLUDED.setpoint_avg * EXCLUDED.checks)
+            / NULLIF(rollup.checks + EXCLUDED.checks, 0),
+            rollup.setpoint_avg, EXCLUDED.setpoint_avg),
+        checks = rollup.checks + EXCLUDED.checks
+    """
+
+DELETE_READ_PAIRS = f"""
+    DELETE FROM {PairTaskRead.__tablename__} WHERE read_id IN (
+        SELECT id FROM {ValuesReading.__tablename__} WHERE db_time < %(cutoff)s)
+    """
+
+
+def _drop_expired_partitions(retention_cursor: cursor, model: type, cutoff: int):
+    retention_cursor.execute(
+        'SELECT child.relname FROM pg_inherits '
+        'JOIN pg_class child ON child.oid = pg_inherits.inhrelid '
+        'JOIN pg_class parent ON parent.oid = pg_inherits.inhparent '
+        'WHERE parent.relname = %s', (model.__tablename__.lower(),))
+    for (partition,) in retention_cursor.fetchall():
+        month_end = partition_month_end(partition)
+        if month_end is not None and month_end <= cutoff:
+            info(f'retention dropping partition {partition}')
+            retention_cursor.execute(f'DROP TABLE {partition}')
+
+
+@db_retry_on_exception()
+def compact_history(days: int = RETENTION_DAYS, bucket: int = ROLLUP_BUCKET):
+    cutoff = int(time()) - days * 24 * 60 * 60
+    parameters = {'cutoff': cutoff, 'bucket': bucket}
+    info(f'retention compacting rows older than {days} days into {bucket} s buckets')
+    with db_connection_and_cursor() as (retention_connection, retention_cursor):
+        retention_cursor.execute(ROLLUP_READS, parameters)
+        info(f'retention read buckets written: {retention_cursor.rowcount}')
+        retention_cursor.execute(ROLLUP_CHECKS, parameters)
+        info(f'retention check buckets written: {retention_cursor.rowcount}')
+        retention_cursor.execute(DELETE_READ_PAIRS, parameters)
+        for model in (ValuesReading, ValuesCheck):
+            retention_cursor.execute(
+                f'DELETE FROM {model.__tablename__} WHERE {partition_key(model)} < %(cutoff)s', parameters)
+            info(f'retention {model.__tablename__} raw rows removed: {retention_cursor.rowcount}')
+        partitioned = partitioned_tables(retention_cursor)
+        for model in (ValuesReading, ValuesCheck):
+            if model.__tablename__.lower() in partitioned:
+                _drop_expired_partitions(retention_cursor, model, cutoff)
+        retention_connection.commit()
+
+
+def perform_compaction():
+    compact_history()
+    maintain_partitions()
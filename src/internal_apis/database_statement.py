@@ -0,0 +1,148 @@
+from src.internal_apis.database_connect import connection_pool
+from psycopg2.extensions import cursor
+from dataclasses import dataclass
+from functools import lru_cache
+from hashlib import sha1
+from collections import Counter
+from threading import Lock
+from typing import Sequence, Union
+
+
+# executions of one statement text before it is prepared server side
+PREPARE_AFTER = 2
+
+OPERATORS = {
+    '=': '{} = %s',
+    '!=': '{} <> %s',
+    '<': '{} < %s',
+    '<=': '{} <= %s',
+    '>': '{} > %s',
+    '>=': '{} >= %s',
+    'in': '{} = ANY(%s)',
+}
+DIRECTIONS = ('ASC', 'DESC')
+
+
+@dataclass(frozen=True)
+class Statement:
+    text: str
+    name: str
+    prepare_text: str
+    execute_text: str
+
+    @classmethod
+    def from_text(cls, text: str):
+        parts = text.split('%s')
+        parameters_count = len(parts) - 1
+        prepare_text = parts[0] + ''.join(f'${number}{part}' for number, part in enumerate(parts[1:], start=1))
+        name = f'stmt_{sha1(text.encode("utf-8")).hexdigest()[:16]}'
+        execute_text = f'EXECUTE {name} ({", ".join(["%s"] * parameters_count)})' if parameters_count \
+            else f'EXECUTE {name}'
+        return cls(text=text, name=name, prepare_text=f'PREPARE {name} AS {prepare_text}', execute_text=execute_text)
+
+
+def _where(predicates: tuple) -> str:
+    if not predicates:
+        return ''
+    return ' WHERE ' + ' AND '.join(OPERATORS[operator].format(column) for column, operator in predicates)
+
+
+def _order_by(order: tuple) -> str:
+    if not order:
+        return ''
+    for _, direction in order:
+        if direction not in DIRECTIONS:
+            raise ValueError(f'Invalid order direction {direction}')
+    return ' ORDER BY ' + ', '.join(f'{column} {direction}' for column, direction in order)
+
+
+@lru_cache(maxsize=256)
+def select_statement(
+        table_name: str,
+        columns: tuple = (),
+        predicates: tuple = (),
+        order: tuple = (),
+        limited: bool = False
+) -> Statement:
+    select_columns = ', '.join(columns) if columns else '*'
+    limit = ' LIMIT %s' if limited else ''
+    return Statement.from_text(
+        f'SELECT {select_columns} FROM {table_name}{_where(predicates)}{_order_by(order)}{limit}')
+
+
+@lru_cache(maxsize=64)
+def related_statement(
+        target_table: str,
+        target_column: str,
+        pair_table: str,
+        target_key: str,
+        owner_key: str,
+        window_column: Union[None, str] = None,
+        order: tuple = (),
+        columns: tuple = ()
+) -> Statement:
+    select_columns = ', '.join(f'target.{column}' for column in columns) if columns else 'target.*'
+    window = f' AND target.{window_column} >= %s' if window_column else ''
+    target_order = tuple((f'target.{column}', direction) for column, direction in order)
+    return Statement.from_text(
+        f'SELECT {select_columns} FROM {target_table} target '
+        f'JOIN {pair_table} pair ON pair.{target_key} = target.{target_column} '
+        f'WHERE pair.{owner_key} = %s{window}{_order_by(target_order)}')
+
+
+@lru_cache(maxsize=64)
+def insert_statement(table_name: str, columns: tuple) -> Statement:
+    values = ', '.join(['%s'] * len(columns))
+    return Statement.from_text(f'INSERT INTO {table_name} ({", ".join(columns)}) VALUES ({values})')
+
+
+@lru_cache(maxsize=64)
+def update_statement(table_name: str, set_columns: tuple, predicates: tuple) -> Statement:
+    assignments = ', '.join(f'{column} = %s' for column in set_columns)
+    return Statement.from_text(f'UPDATE {table_name} SET {assignments}{_where(predicates)}')
+
+
+@lru_cache(maxsize=64)
+def delete_statement(table_name: str, predicates: tuple = ()) -> Statement:
+    return Statement.from_text(f'DELETE FROM {table_name}{_where(predicates)}')
+
+
+_builders = (select_statement, related_statement, insert_statement, update_statement, delete_statement)
+_executions = Counter()
+_counts = Counter()
+_lock = Lock()
+
+
+def _count(kind: str):
+    with _lock:
+        _counts[kind] += 1
+
+
+def execute_statement(statement_cursor: cursor, statement: Statement, parameters: Sequence = ()):
+    with _lock:
+        _executions[statement.name] += 1
+        is_hot = _executions[statement.name] >= PREPARE_AFTER
+    if not is_hot:
+        statement_cursor.execute(statement.text, parameters)
+        _count('plain')
+        return
+    prepared = connection_pool.prepared_statements(statement_cursor.connection)
+    if statement.name not in prepared:
+        statement_cursor.execute(statement.prepare_text)
+        prepared.add(statement.name)
+        _count('prepares')
+    statement_cursor.execute(statement.execute_text, parameters)
+    _count('prepared')
+
+
+def statement_stats() -> dict:
+    text_cache = [builder.cache_info() for builder in _builders]
+    with _lock:
+        counts = dict(_counts)
+    return {
+        'text_hits': sum(c.hits for c in text_cache),
+        'text_misses': sum(c.misses for c in text_cache),
+        'prepares': counts.get('prepares', 0),
+        'executed_prepared': counts.get('prepared', 0),
+        'executed_plain': counts.get('plain', 0)
+    }
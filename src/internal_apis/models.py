@@ -1,4 +1,5 @@
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, fields
+from operator import attrgetter
 from random import choice
 from typing import Union
 from decimal import Decimal
@@ -10,7 +11,22 @@ from time import time
 API_INTERVAL = 30
 
 
+def slotted(cls):
+    columns = tuple(model_field.name for model_field in fields(cls))
+    class_dict = {key: value for key, value in cls.__dict__.items() if key not in columns + ('__dict__', '__weakref__')}
+    class_dict['__slots__'] = columns
+    slotted_class = type(cls)(cls.__name__, cls.__bases__, class_dict)
+    slotted_class.__columns__ = columns
+    slotted_class.__row__ = attrgetter(*columns)
+    return slotted_class
+
+
+def as_row(data_object) -> tuple:
+    return data_object.__row__(data_object)
+
+
 class Timestamped:
+    __slots__ = ()
     timestamp: int
     INTERVAL = API_INTERVAL + 5
 
@@ -19,9 +35,11 @@ class Timestamped:
 
 
 class DataObject:
+    __slots__ = ()
+
     def get_log_info(self) -> str:
         skip_labels = ('id', 'container')
-        log_object = {key: value for key, value in self.__dict__.items() if key not in skip_labels}
+        log_object = {key: getattr(self, key) for key in self.__columns__ if key not in skip_labels}
         for key, value in log_object.items():
             if 'time' in key and isinstance(value, int):
                 log_object[key] = datetime.strftime(
@@ -29,9 +47,11 @@ class DataObject:
         return str(log_object)[1:-1].replace("'", "")
 
 
+@slotted
 @dataclass
 class ValuesReading(DataObject):
     __tablename__ = 'read'
+    __partitionkey__ = 'db_time'
     id: str
     temperature: Union[str, Decimal]
     read_time: Union[str, int]
@@ -54,6 +74,7 @@ def use_read(read_read: ValuesReading) -> ValuesReading:
         thermometer=read_read.thermometer)
 
 
+@slotted
 @dataclass(frozen=True)
 class PairTaskRead:
     __tablename__ = 'task_reads'
@@ -61,14 +82,18 @@ class PairTaskRead:
     read_id: str
 
 
+@slotted
 @dataclass
 class ThingThermometer:
     __tablename__ = 'thermometer'
+    __primarykey__ = 'device_id'
     device_id: str
     device_group: str
     device_name: str
+    page_href: Union[None, str] = None
 
 
+@slotted
 @dataclass(frozen=True)
 class PairContainerThermometer:
     __tablename__ = "container_thermometers"
@@ -89,13 +114,16 @@ def choose_label() -> str:
     return chosen_label
 
 
+@slotted
 @dataclass
 class ThingContainer:
     __tablename__ = 'Container'
+    __primarykey__ = 'name'
     name: str
     label: str = field(default_factory=lambda: choose_label())
 
 
+@slotted
 @dataclass
 class ValuesControl(DataObject, Timestamped):
     __tablename__ = 'control'
@@ -104,9 +132,12 @@ class ValuesControl(DataObject, Timestamped):
     target_setpoint: str
 
 
+@slotted
 @dataclass
 class ValuesCheck(DataObject, Timestamped):
     __tablename__ = 'container_check'
+    __partitionkey__ = 'timestamp'
+    __indexes__ = (('container', 'timestamp'),)
     id: str
     container: str
     timestamp: int
@@ -116,6 +147,7 @@ class ValuesCheck(DataObject, Timestamped):
     read_setpoint: Union[str, Decimal]
 
 
+@slotted
 @dataclass(frozen=True)
 class PairTaskControl:
     __tablename__ = "task_controls"
@@ -123,6 +155,7 @@ class PairTaskControl:
     control_id: str
 
 
+@slotted
 @dataclass(frozen=True)
 class PairSetControl:
     __tablename__ = "set_controls"
@@ -130,6 +163,7 @@ class PairSetControl:
     control_id: str
 
 
+@slotted
 @dataclass
 class ValuesTasking:
     __tablename__ = 'Task'
@@ -149,6 +183,7 @@ class ValuesTasking:
         self.t_freeze = Decimal(self.t_freeze)
 
 
+@slotted
 @dataclass(frozen=True)
 class PairContainerTask:
     __tablename__ = 'container_task'
@@ -156,6 +191,7 @@ class PairContainerTask:
     task_id: str
 
 
+@slotted
 @dataclass
 class ValuesSetting(Timestamped):
     __tablename__ = 'temp_set'
@@ -165,6 +201,7 @@ class ValuesSetting(Timestamped):
     timestamp: int
 
 
+@slotted
 @dataclass(frozen=True)
 class PairContainerSet:
     __tablename__ = 'container_set'
@@ -172,6 +209,64 @@ class PairContainerSet:
     set_id: str
 
 
+@slotted
+@dataclass
+class RollupReading:
+    __tablename__ = 'read_rollup'
+    __primarykey__ = ('thermometer', 'bucket')
+    thermometer: str
+    bucket: int
+    reads: int
+    t_min: Union[None, Decimal]
+    t_max: Union[None, Decimal]
+    t_avg: Union[None, Decimal]
+
+
+@slotted
+@dataclass
+class RollupCheck:
+    __tablename__ = 'container_check_rollup'
+    __primarykey__ = ('container', 'bucket')
+    container: str
+    bucket: int
+    checks: int
+    setpoint_min: Union[None, Decimal]
+    setpoint_max: Union[None, Decimal]
+    setpoint_avg: Union[None, Decimal]
+
+
+def primary_key(model: type) -> str:
+    return getattr(model, '__primarykey__', 'id')
+
+
+@dataclass(frozen=True)
+class Relation:
+    pair: type
+    owner: type
+    owner_key: str
+    target: type
+    target_key: str
+    window: Union[None, str] = None
+
+
+task_reads = Relation(PairTaskRead, ValuesTasking, 'task_id', ValuesReading, 'read_id', window='db_time')
+task_controls = Relation(PairTaskControl, ValuesTasking, 'task_id', ValuesControl, 'control_id', window='timestamp')
+set_controls = Relation(PairSetControl, ValuesSetting, 'set_id', ValuesControl, 'control_id', window='timestamp')
+container_tasks = Relation(PairContainerTask, ThingContainer, 'container_id', ValuesTasking, 'task_id')
+container_sets = Relation(PairContainerSet, ThingContainer, 'container_id', ValuesSetting, 'set_id')
+container_thermometers = Relation(
+    PairContainerThermometer, ThingContainer, 'container_id', ThingThermometer, 'thermometer_id')
+
+relations = [
+    task_reads,
+    task_controls,
+    set_controls,
+    container_tasks,
+    container_sets,
+    container_thermometers,
+]
+
+
 data_objects = [
     PairContainerThermometer,
     PairTaskRead,
@@ -179,6 +274,8 @@ data_objects = [
     PairSetControl,
     PairContainerTask,
     PairContainerSet,
+    RollupReading,
+    RollupCheck,
     ValuesCheck,
     ValuesControl,
     ValuesReading,
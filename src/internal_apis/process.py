@@ -2,7 +2,14 @@ from src.external_processes.tasking import perform_task
 from src.external_processes.setting import perform_setting
 from src.internal_processes.checking import perform_check
 from src.external_processes.initialize import initialize_database
+from src.external_processes.batch import perform_all
+from src.internal_apis.database_migrate import migrate_database
+from src.internal_apis.database_retention import perform_compaction
 from src.internal_apis.test import perform_test
+from src.internal_apis.database_connect import connection_pool
+from src.internal_apis.database_statement import statement_stats
+from src.external_apis.measure import measure_session, measure_snapshot
+from src.external_apis.drive_web import browser_manager, wait_stats, navigation_stats
 from hashlib import sha256
 from pathlib import Path
 from dotenv import dotenv_values
@@ -21,7 +28,10 @@ class Event:
     key_2: str
     test: bool
     initialize: bool
+    migrate: bool
+    compact: bool
     check: bool
+    run_all: bool
     task: Union[None, str]
     setting: Union[None, str]
 
@@ -43,7 +53,10 @@ class Event:
         _map = {
             'test': perform_test,
             'initialize': initialize_database,
+            'migrate': migrate_database,
+            'compact': perform_compaction,
             'check': perform_check,
+            'run_all': perform_all,
             'task': perform_task,
             'set': perform_setting,
         }
@@ -52,11 +65,22 @@ class Event:
                 if value:
                     info(f'process launching {key}')
                     if isinstance(value, bool):
-                        _map[key]()
+                        return _map[key]()
                     elif isinstance(value, str):
-                        _map[key](value)
+                        return _map[key](value)
                     break
 
 
 def run_lambda(event, _):
-    Event(event).run_event()
+    # waits and navigations are logged per invocation, the other stats count across warm ones
+    wait_stats.reset()
+    navigation_stats.reset()
+    result = Event(event).run_event()
+    info(f'process db pool {connection_pool.stats()}')
+    info(f'process db statements {statement_stats()}')
+    info(f'process measure session {measure_session.stats()}')
+    info(f'process measure snapshot {measure_snapshot.stats()}')
+    info(f'process browser {browser_manager.stats()}')
+    info(f'process browser waits {wait_stats.stats()}')
+    info(f'process browser navigations {navigation_stats.stats()}')
+    return result
@@ -0,0 +1,41 @@
+from src.internal_apis.models import (
+    ValuesTasking, ValuesCheck, PairContainerTask, task_controls, task_reads, container_thermometers)
+from typing import Union
+
+
+# the selections of the tasking path, shared by its loaders and the migration plan check
+
+
+def processed_task_selection(task_id: str) -> dict:
+    return dict(table_name=ValuesTasking.__tablename__, where_equals={'id': task_id}, model=ValuesTasking)
+
+
+def container_name_selection(task_id: str) -> dict:
+    return dict(table_name=PairContainerTask.__tablename__, where_equals={'task_id': task_id}, model=PairContainerTask)
+
+
+def container_checks_selection(container_name: str, start: int) -> dict:
+    # descending order
+    return dict(
+        table_name=ValuesCheck.__tablename__,
+        where_equals={'container': container_name},
+        where=[('timestamp', '>=', start - 35 * 60)],
+        order_by={'timestamp': 'DESC'},
+        model=ValuesCheck)
+
+
+def controls_selection(task_id: str) -> dict:
+    # descending order
+    return dict(relation=task_controls, owner_id=task_id, order_by={'timestamp': 'DESC'})
+
+
+def thermometers_selection(container_name: str) -> dict:
+    return dict(relation=container_thermometers, owner_id=container_name)
+
+
+def past_reads_selection(task_id: str, since: Union[None, int]) -> dict:
+    return dict(relation=task_reads, owner_id=task_id, since=since)
+
+
+# thermometer columns rewritten when a device moved to another measurement page
+PAGE_INDEX_COLUMNS = ('page_href',)
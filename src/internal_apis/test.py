@@ -12,13 +12,13 @@ class Test:
 
     def test_database_connection(self):
         info('testing database connection and cursor')
-        db_connection, db_cursor = db_connection_and_cursor()
-        assert isinstance(db_connection, connection)
-        assert isinstance(db_cursor, cursor)
+        with db_connection_and_cursor() as (db_connection, db_cursor):
+            assert isinstance(db_connection, connection)
+            assert isinstance(db_cursor, cursor)
 
     def retrieve_things(self):
-        self._containers = [ThingContainer(**c) for c in select_from_db(ThingContainer.__tablename__)]
-        self._thermometers = [ThingThermometer(**t) for t in select_from_db(ThingThermometer.__tablename__)]
+        self._containers = select_from_db(ThingContainer.__tablename__, model=ThingContainer)
+        self._thermometers = select_from_db(ThingThermometer.__tablename__, model=ThingThermometer)
         info(f'containers: {len(self._containers)}')
         if self._containers:
             for container in self._containers:
@@ -38,7 +38,7 @@ class Test:
 
     def test_measurement(self):
         info('testing measurement availability')
-        read_thermometers = read_all_thermometers()
+        read_thermometers = read_all_thermometers(fresh=True)
         for device_log in read_thermometers:
             info(f'{device_log.measure_time}   '
                  f'{device_log.temperature}   '
@@ -1,6 +1,8 @@
 from src.external_apis.drive_control import CheckContainersDriver, DriverCheck
 from src.internal_apis.database_query import (insert_multiple_objects_into_db, select_from_db)
-from src.internal_apis.models import ValuesCheck, PairContainerTask, PairContainerSet
+from src.internal_apis.models import ValuesCheck, PairContainerSet
+from src.internal_apis.selections import container_name_selection, container_checks_selection
+from src.internal_processes.driving import driving_plan
 from uuid import uuid4
 from decimal import Decimal
 from typing import Union
@@ -27,11 +29,14 @@ class _Checking:
         if driver_controls:
             self.driver_checks = driver_controls
         self._create_checks_from_driver()
+        if driving_plan.active:
+            info('check values already saved with the planned snapshot')
+            return
         insert_multiple_objects_into_db(self.created_checks)
 
     def driver_check_containers(self):
         info('driver checking containers')
-        self.driver_checks = CheckContainersDriver().read_values()
+        self.driver_checks = driving_plan.checks if driving_plan.active else CheckContainersDriver().read_values()
         self.create_and_save_checks()
 
 
@@ -39,14 +44,19 @@ def perform_check():
     _Checking().driver_check_containers()
 
 
+def save_driver_checks(driver_checks: list[DriverCheck]):
+    _Checking().create_and_save_checks(driver_checks)
+
+
 class CheckingSetting(_Checking):
     set_id: str
     container: str
 
     def _get_set_container_name(self) -> str:
         info('check target container name')
-        return [PairContainerSet(**c) for c in select_from_db(
-            table_name=PairContainerSet.__tablename__, where_equals={'set_id': self.set_id})].pop().container_id
+        return select_from_db(
+            table_name=PairContainerSet.__tablename__, where_equals={'set_id': self.set_id},
+            model=PairContainerSet).pop().container_id
 
     def temperature_setting_verification(self) -> Union[Decimal, ValueError]:
         info('check working temperature setting value for comparison')
@@ -75,10 +85,10 @@ class CheckingTasking(_Checking):
     settings: Union[None, list[Decimal]]
     recent: Union[None, Decimal]
 
-    def _get_related_container_name(self) -> str:
+    @staticmethod
+    def related_container_name(task_id: str) -> str:
         info('check relevant container name')
-        return [PairContainerTask(**c) for c in select_from_db(
-            table_name=PairContainerTask.__tablename__, where_equals={'task_id': self._task_id})].pop().container_id
+        return select_from_db(**container_name_selection(task_id)).pop().container_id
 
     def _log_checks(self):
         info(f'check existing count: {len(self.checks)}')
@@ -87,25 +97,18 @@ class CheckingTasking(_Checking):
 
     def _retrieve_container_checks(self) -> Union[None, list[ValuesCheck]]:
         info('check retrieve existing values')
-        select_checks = select_from_db(
-            table_name=ValuesCheck.__tablename__,
-            where_equals={'container': self.container_name},
-            keys=True)
+        select_checks = select_from_db(**container_checks_selection(self.container_name, self._start))
         info(f'check selected: {len(select_checks)}')
         if select_checks:
-            checks = [ValuesCheck(**check) for check in select_checks]
-            checks = [c for c in checks if c.timestamp >= self._start - 35 * 60]
-            # descending order
-            checks = sorted(checks, key=lambda c: c.timestamp, reverse=True)
-            return checks
+            return select_checks
         else:
             info(f'check none existing')
             return None
 
-    def __init__(self, task_id: str, task_start: int):
+    def __init__(self, task_id: str, task_start: int, container_name: Union[None, str] = None):
         self._task_id = task_id
         self._start = task_start
-        self.container_name = self._get_related_container_name()
+        self.container_name = container_name or self.related_container_name(task_id)
         self.checks = self._retrieve_container_checks()
         if self.checks:
             self._log_checks()
@@ -1,5 +1,6 @@
 from src.internal_apis.models import ValuesControl, PairTaskControl, PairSetControl
-from src.internal_apis.database_query import insert_one_object_into_db, select_from_db
+from src.internal_apis.selections import controls_selection
+from src.internal_apis.database_query import insert_one_object_into_db, select_related
 from decimal import Decimal
 from time import time
 from uuid import uuid4
@@ -38,23 +39,10 @@ class ControllingTasking(_Controlling):
     settings: Union[None, list[Decimal]]
     recent: Union[None, Decimal]
 
-    def _retrieve_which_controls(self) -> Union[list[str], None]:
-        info('control task relevant ids')
-        control_ids = select_from_db(table_name=PairTaskControl.__tablename__,
-                                     columns=['control_id'],
-                                     where_equals={'task_id': self._task_id},
-                                     keys=False)
-        return control_ids if control_ids else None
-
     def _retrieve_relevant_controls(self) -> list[ValuesControl]:
         info('control task relevant retrieve')
-        control_ids = self._retrieve_which_controls()
-        if control_ids:
-            controls = [
-                ValuesControl(**control) for control in
-                select_from_db(ValuesControl.__tablename__, where_in={'id': control_ids}, keys=True)]
-            # descending order
-            controls = sorted(controls, key=lambda c: c.timestamp, reverse=True)
+        controls = select_related(**controls_selection(self._task_id))
+        if controls:
             info(f'control total task count {len(controls)}')
             for control in controls:
                 info(f'control {control.get_log_info()}')
@@ -1,9 +1,59 @@
 from src.external_apis.drive_control import ControlContainersDriver, DriverCheck
-from typing import Union
+from contextlib import contextmanager
+from typing import Iterator, Union
 from decimal import Decimal
 from logging import info, warning
 
 
+class DrivingConflict(Exception):
+    def __init__(self, message="Container already planned with another setting"):
+        warning('driving plan conflict')
+        self.message = message
+        super().__init__(self.message)
+
+
+class DrivingPlan:
+    checks: Union[None, list[DriverCheck]]
+    targets: dict[str, str]
+    claimed: list[str]
+
+    def __init__(self):
+        self.checks = None
+        self.targets = {}
+        self.claimed = []
+
+    @property
+    def active(self) -> bool:
+        return self.checks is not None
+
+    @contextmanager
+    def collecting(self, checks: list[DriverCheck]) -> Iterator[dict[str, str]]:
+        # settings are only collected, the caller drives them against the given container checks
+        self.checks, self.targets, self.claimed = checks, {}, []
+        try:
+            yield self.targets
+        finally:
+            self.checks = None
+
+    @contextmanager
+    def claiming(self) -> Iterator[list[str]]:
+        # the containers planned by one task or set, whose outcomes decide what it persists
+        self.claimed = []
+        yield self.claimed
+
+    def add(self, container_name: str, temperature_setting: str) -> Union[list[DriverCheck], DrivingConflict]:
+        # the first setting of a container holds, a different later one fails its task or set
+        previous_setting = self.targets.get(container_name)
+        if previous_setting not in (None, temperature_setting):
+            raise DrivingConflict(f'{container_name} already planned to {previous_setting}, not {temperature_setting}')
+        self.targets[container_name] = temperature_setting
+        self.claimed.append(container_name)
+        return self.checks
+
+
+driving_plan = DrivingPlan()
+
+
 class DrivingAction:
     container_name: str
     temperature_setting: Union[int, str, Decimal]
@@ -34,6 +84,9 @@ class DrivingAction:
         self.temperature_setting = self.parse_temperature_value(temperature_setting)
 
     def driver_check_and_introduce_setting(self) -> list[DriverCheck]:
+        if driving_plan.active:
+            info(f'driving planned to set {self.temperature_setting} in {self.container_name}')
+            return driving_plan.add(self.container_name, self.temperature_setting)
         info(f'driving launching to set {self.temperature_setting} in {self.container_name}')
         return ControlContainersDriver().check_containers_and_set_temperature(
             container=self.container_name,
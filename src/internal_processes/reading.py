@@ -1,6 +1,8 @@
-from src.external_apis.measure import read_all_thermometers, DeviceRead
-from src.internal_apis.database_query import insert_multiple_objects_into_db, select_from_db
-from src.internal_apis.models import PairContainerThermometer, ValuesReading, PairTaskRead, use_read
+from src.external_apis.measure import read_all_thermometers, read_thermometer_pages, measure_snapshot, DeviceRead
+from src.internal_apis.database_query import insert_multiple_objects_into_db, select_related, update_columns_in_db
+from src.internal_apis.models import ThingThermometer, ValuesReading, PairTaskRead, use_read
+from src.internal_apis.selections import thermometers_selection, past_reads_selection, PAGE_INDEX_COLUMNS
+from dataclasses import replace
 from uuid import uuid4
 from logging import info
 from decimal import Decimal
@@ -10,23 +12,46 @@ from typing import Union
 class ReadingTasking:
     _task_id: str
     _container_name: str
+    _since: Union[None, int]
+    _fresh: bool
     relevant_reads: list[ValuesReading]
     past_reads: Union[None, list[ValuesReading]]
     current_temperatures: list[Decimal]
     past_temperatures: Union[None, list[Decimal]]
 
-    def relevant_thermometer_ids(self) -> list[str]:
-        info('read fetching container thermometer pairs')
-        device_pairings = [
-            PairContainerThermometer(**val) for val in select_from_db(PairContainerThermometer.__tablename__)]
-        thermometer_ids = [rel.thermometer_id for rel in device_pairings if rel.container_id == self._container_name]
-        info(f'read relevant thermometer ids found {len(thermometer_ids)}')
-        return thermometer_ids
+    def relevant_thermometers(self) -> list[ThingThermometer]:
+        info('read fetching container thermometers')
+        thermometers = select_related(**thermometers_selection(self._container_name))
+        info(f'read relevant thermometers found {len(thermometers)}')
+        return thermometers
+
+    @staticmethod
+    def update_page_index(thermometers: list[ThingThermometer], reads: list[DeviceRead]):
+        read_hrefs = {r.device_id: r.page_href for r in reads}
+        moved_thermometers = [
+            replace(t, page_href=read_hrefs[t.device_id]) for t in thermometers
+            if t.device_id in read_hrefs and t.page_href != read_hrefs[t.device_id]]
+        if moved_thermometers:
+            info(f'read updating page index of {len(moved_thermometers)} thermometers')
+            update_columns_in_db(moved_thermometers, PAGE_INDEX_COLUMNS)
 
     def read_relevant_thermometers(self) -> list[DeviceRead]:
         info('read relevant thermometers')
-        relevant_ids = self.relevant_thermometer_ids()
-        relevant_reads = [t for t in read_all_thermometers() if t.device_id in relevant_ids]
+        thermometers = self.relevant_thermometers()
+        if not thermometers:
+            return []
+        relevant_ids = {t.device_id for t in thermometers}
+        page_hrefs = {t.page_href for t in thermometers}
+        relevant_reads = []
+        snapshot_reads = None if self._fresh else measure_snapshot.cached()
+        if snapshot_reads is not None:
+            relevant_reads = [t for t in snapshot_reads if t.device_id in relevant_ids]
+        elif None not in page_hrefs:
+            relevant_reads = [t for t in read_thermometer_pages(page_hrefs) if t.device_id in relevant_ids]
+        if len(relevant_reads) < len(relevant_ids):
+            info('read thermometers missing from indexed pages, reading all pages')
+            relevant_reads = [t for t in read_all_thermometers(self._fresh) if t.device_id in relevant_ids]
+            self.update_page_index(thermometers, relevant_reads)
         info(f'read relevant count {len(relevant_reads)}')
         if relevant_reads:
             temperatures = ', '.join(r.temperature for r in relevant_reads)
@@ -62,23 +87,20 @@ class ReadingTasking:
         return read_time_valid
 
     def retrieve_past_reads(self) -> Union[None, list[ValuesReading]]:
-        relevant_read_ids = select_from_db(
-            PairTaskRead.__tablename__,
-            columns=['read_id'],
-            where_equals={'task_id': self._task_id},
-            keys=False)
-        if relevant_read_ids:
-            relevant_read_records = select_from_db(ValuesReading.__tablename__, where_in={'id': relevant_read_ids})
-            relevant_reads = [use_read(ValuesReading(**r)) for r in relevant_read_records]
+        relevant_read_records = select_related(**past_reads_selection(self._task_id, self._since))
+        if relevant_read_records:
+            relevant_reads = [use_read(r) for r in relevant_read_records]
             info(f'reads past count: {len(relevant_reads)}')
             return relevant_reads
         else:
             return None
 
-    def __init__(self, task_id: str, container: str):
+    def __init__(self, task_id: str, container: str, since: Union[None, int] = None, fresh: bool = False):
         info('read initiate')
         self._task_id = task_id
         self._container_name = container
+        self._since = since
+        self._fresh = fresh
         self.past_reads = self.retrieve_past_reads()
         if self.past_reads:
             self.past_temperatures = [r.temperature for r in self.past_reads]
@@ -7,4 +7,4 @@ logger.setLevel(logging.INFO)
 
 def handler(event=None, context=None):
     logging.info('running lambda')
-    run_lambda(event, context)
+    return run_lambda(event, context)
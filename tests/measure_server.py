@@ -0,0 +1,128 @@
+"""Local stand-in for the measurement platform serving generated device pages.
+
+The devices grid is paged like the platform's: rows of seven cells, a pager
+showing at most ten page links around the current page and a next item that
+is disabled on the last page. The grid needs the session cookie handed out
+by the login form, every page answers after the given latency.
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from http.cookies import SimpleCookie
+from threading import Thread, Lock
+from urllib.parse import parse_qsl, urlsplit
+from time import sleep
+from uuid import uuid4
+
+
+GRID_PATH = '/devices'
+SESSION_COOKIE = 'measure_session'
+PAGER_BUTTONS = 10
+ACTIVE = ' class="active"'
+
+LOGIN_PAGE = '''<!DOCTYPE html><html><head><title>Login</title></head><body>
+<form id="login-form" action="/devices" method="post">
+<input type="hidden" name="_csrf" value="measure-token">
+<input type="text" name="LoginForm[username]">
+<input type="password" name="LoginForm[password]">
+<button type="submit">Login</button>
+</form></body></html>'''
+
+
+def device_row(number: int) -> str:
+    return (f'<tr data-key="{number}"><td><input type="checkbox" name="selection[]" value="{number}"></td>'
+            f'<td>{number + 1}</td><td><a href="/devices/view?id={number}">Device {number:05d}</a></td>'
+            f'<td>Group {number % 7}</td><td>{-18 + number % 40 / 10:.1f}</td>'
+            f'<td>18.10.2026 10:{number % 60:02d}</td><td>{100000 + number}</td></tr>')
+
+
+def pager(number: int, pages: int) -> str:
+    first = max(1, min(number - PAGER_BUTTONS // 2, pages - PAGER_BUTTONS + 1))
+    last = min(pages, first + PAGER_BUTTONS - 1)
+    items = ['<li class="prev disabled"><span>&laquo;</span></li>' if number == 1 else
+             f'<li class="prev"><a href="?page={number - 1}">&laquo;</a></li>']
+    items += [f'<li{ACTIVE if page == number else ""}><a href="?page={page}">{page}</a></li>'
+              for page in range(first, last + 1)]
+    items.append('<li class="next disabled"><span>&raquo;</span></li>' if number == pages else
+                 f'<li class="next"><a href="?page={number + 1}">&raquo;</a></li>')
+    return f'<ul class="pagination">{"".join(items)}</ul>'
+
+
+def device_page(number: int, pages: int, rows: int) -> str:
+    devices = ''.join(device_row(row) for row in range((number - 1) * rows, number * rows))
+    return (f'<!DOCTYPE html><html><head><title>Devices</title></head><body><div class="grid-view">'
+            f'<div class="summary">Page <b>{number}</b> of <b>{pages}</b>.</div>'
+            f'<table class="table"><thead><tr><th></th><th>#</th><th>Name</th><th>Group</th><th>Temperature</th>'
+            f'<th>Time</th><th>ID</th></tr></thead><tbody>{devices}</tbody></table>'
+            f'{pager(number, pages) if pages > 1 else ""}</div></body></html>')
+
+
+class MeasureServer:
+    pages: int
+    rows: int
+    latency: float
+    received: list[str]
+
+    def __init__(self, pages: int = 10, rows: int = 50, latency: float = 0.0):
+        self.pages, self.rows, self.latency = pages, rows, latency
+        self.received = []
+        self._sessions: set[str] = set()
+        self._lock = Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self._thread = Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address
+        return f'http://{host}:{port}{GRID_PATH}'
+
+    def start(self) -> 'MeasureServer':
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _respond(self, method: str, path: str, query: dict, form: dict, cookie: str) -> tuple[int, dict, bytes]:
+        with self._lock:
+            self.received.append(f'{method} {path}?{"&".join(f"{k}={v}" for k, v in query.items())}')
+            signed_in = cookie in self._sessions
+        headers = {'Content-Type': 'text/html; charset=utf-8'}
+        if path != GRID_PATH:
+            return 404, headers, b'not found'
+        if method == 'POST' and form.get('LoginForm[password]') and form.get('_csrf') == 'measure-token':
+            session = uuid4().hex
+            with self._lock:
+                self._sessions.add(session)
+            headers['Set-Cookie'] = f'{SESSION_COOKIE}={session}; Path=/; HttpOnly'
+        elif not signed_in:
+            return 200, headers, LOGIN_PAGE.encode()
+        number = int(query.get('page') or 1)
+        if not 1 <= number <= self.pages:
+            return 404, headers, b'no such page'
+        sleep(self.latency)
+        return 200, headers, device_page(number, self.pages, self.rows).encode()
+
+    def _handler(self) -> type:
+        server = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            def _serve(self):
+                split = urlsplit(self.path)
+                length = int(self.headers.get('Content-Length') or 0)
+                form = dict(parse_qsl(self.rfile.read(length).decode(), keep_blank_values=True))
+                cookie = SimpleCookie(self.headers.get('Cookie') or '').get(SESSION_COOKIE)
+                status, headers, content = server._respond(
+                    self.command, split.path, dict(parse_qsl(split.query)), form, cookie.value if cookie else '')
+                self.send_response(status)
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.send_header('Content-Length', str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            do_GET = do_POST = _serve
+
+            def log_message(self, *_):
+                pass
+
+        return _Handler
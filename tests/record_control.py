@@ -0,0 +1,117 @@
+"""Record the control platform's XHR exchanges as a replay recording.
+
+Drives the portal with the browser driver and the .env credentials while a
+script added to every page logs each XHR and fetch the portal sends, with its
+form and the response. Passwords are masked. Without --execute the set point
+dialog is closed instead of executed, a pending previous setting is still
+canceled:
+
+    python -m tests.record_control --container MSKU1000011 --temperature -18.0 --output tests/recordings/portal.json
+
+The CONTROL_HTTP_ paths of the http driver and the recording's paths come
+from the recorded urls.
+"""
+from src.external_apis.drive_control import ControlContainersDriver
+from argparse import ArgumentParser
+from pathlib import Path
+from urllib.parse import parse_qsl, urlsplit
+from json import dumps, loads
+from typing import Union
+
+
+STORAGE_KEY = 'replay_recording'
+
+# runs before the portal's scripts, localStorage keeps the log across the sign in navigation
+RECORD_SCRIPT = '''
+(() => {
+    const key = '%s';
+    const store = (entry) => {
+        const log = JSON.parse(localStorage.getItem(key) || '[]');
+        log.push(entry);
+        localStorage.setItem(key, JSON.stringify(log));
+    };
+    const open = XMLHttpRequest.prototype.open;
+    const send = XMLHttpRequest.prototype.send;
+    XMLHttpRequest.prototype.open = function (method, url) {
+        this._replay = {method: method.toUpperCase(), url: new URL(url, location.href).href};
+        return open.apply(this, arguments);
+    };
+    XMLHttpRequest.prototype.send = function (body) {
+        const request = this._replay;
+        this.addEventListener('loadend', () => store({
+            ...request, request: typeof body === 'string' ? body : '', status: this.status,
+            content_type: this.getResponseHeader('Content-Type') || '',
+            body: this.responseType === '' || this.responseType === 'text' ? this.responseText : ''}));
+        return send.apply(this, arguments);
+    };
+    const fetched = window.fetch;
+    window.fetch = async (resource, init = {}) => {
+        const response = await fetched(resource, init);
+        const text = await response.clone().text();
+        store({method: (init.method || 'GET').toUpperCase(), url: new URL(String(resource.url || resource),
+            location.href).href, request: typeof init.body === 'string' ? init.body : '', status: response.status,
+            content_type: response.headers.get('Content-Type') || '', body: text});
+        return response;
+    };
+    document.addEventListener('submit', (event) => store({
+        method: (event.target.method || 'GET').toUpperCase(), url: event.target.action,
+        request: new URLSearchParams(new FormData(event.target)).toString(), status: null,
+        content_type: '', body: ''}), true);
+})();
+''' % STORAGE_KEY
+
+
+def _masked(values: dict, password: str) -> dict:
+    return {key: '***' if value == password else value for key, value in values.items()}
+
+
+def _exchange(entry: dict, password: str) -> dict:
+    body: Union[str, dict, list] = entry['body'].replace(password, '***') if password else entry['body']
+    if 'json' in entry['content_type']:
+        body = loads(body or 'null')
+    exchange = {'method': entry['method'], 'path': urlsplit(entry['url']).path}
+    form = _masked(dict(parse_qsl(entry['request'], keep_blank_values=True)), password)
+    form.update(parse_qsl(urlsplit(entry['url']).query, keep_blank_values=True))
+    if form:
+        exchange['form'] = form
+    if entry['status'] not in (None, 200):
+        exchange['status'] = entry['status']
+    if entry['content_type']:
+        exchange['content_type'] = entry['content_type']
+    exchange['body'] = body
+    return exchange
+
+
+def record(container: Union[None, str], temperature: Union[None, str], execute: bool) -> dict:
+    driver = ControlContainersDriver()
+    driver.debug = not execute
+    driver.driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {'source': RECORD_SCRIPT})
+    try:
+        driver.driver.get(driver.url)
+        driver.driver.execute_script(f'localStorage.removeItem("{STORAGE_KEY}")')
+        login_page = driver.driver.page_source
+        driver.check_containers()
+        if container:
+            driver.container, driver.temperature = container, temperature
+            driver._temperature_setting_action()
+        entries = loads(driver.driver.execute_script(f'return localStorage.getItem("{STORAGE_KEY}") || "[]"'))
+    finally:
+        driver.release(discard=True)
+    return {
+        'note': f'Recorded from {urlsplit(driver.url).netloc}, fill in paths from the exchanges below.',
+        'paths': {},
+        'exchanges': [{'method': 'GET', 'path': '/', 'body': login_page}] + [
+            _exchange(entry, driver.password) for entry in entries],
+    }
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--container')
+    parser.add_argument('--temperature')
+    parser.add_argument('--execute', action='store_true', help='execute the set point command')
+    parser.add_argument('--output', type=Path, default=Path(__file__).parent / 'recordings' / 'portal.json')
+    arguments = parser.parse_args()
+    recording = record(arguments.container, arguments.temperature, arguments.execute)
+    arguments.output.write_text(dumps(recording, indent=2) + '\n')
+    print(f'{len(recording["exchanges"])} exchanges written to {arguments.output}')
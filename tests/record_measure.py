@@ -0,0 +1,48 @@
+"""Record pages of the measurement platform for the parser tests.
+
+Signs in with the .env credentials and writes the first view and the given
+following pages of the devices grid as they were served:
+
+    python -m tests.record_measure --pages 6 12 --output tests/recordings/measure
+
+The pages are reached by following the next links from the first view, the
+committed recordings are replaced file by file.
+"""
+from src.external_apis import measure
+from src.external_apis.measure import _get_next_page_href, _parse_page, measure_session
+from argparse import ArgumentParser
+from pathlib import Path
+from re import findall
+
+
+def page_number(href: str) -> int:
+    return int(findall(r'\d+', href)[-1])
+
+
+def record(pages: list[int], output: Path) -> list[Path]:
+    session, first_view = measure_session.first_view()
+    written = [output / 'devices_1.html']
+    written[0].write_bytes(first_view)
+    content = first_view
+    while pages and max(pages) > 1:
+        try:
+            href = _get_next_page_href(_parse_page(content))
+        except StopIteration:
+            break
+        content = session.get(f'{measure.base_url}{href}').content
+        number = page_number(href)
+        if number in pages:
+            written.append(output / f'devices_{number}.html')
+            written[-1].write_bytes(content)
+        if number >= max(pages):
+            break
+    return written
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pages', type=int, nargs='*', default=[])
+    parser.add_argument('--output', type=Path, default=Path(__file__).parent / 'recordings' / 'measure')
+    arguments = parser.parse_args()
+    for path in record(arguments.pages, arguments.output):
+        print(f'written {path}')
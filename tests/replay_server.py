@@ -0,0 +1,131 @@
+"""Local stand-in for the control platform that replays recorded exchanges.
+
+A recording, as written by python -m tests.record_control, lists the
+exchanges of the portal by method and path. Exchanges may name the form
+fields they answer, repeated exchanges are served in order and the last one
+keeps being served. Every path but the page and the sign in path needs the
+session cookie handed out by a successful sign in, every response can be
+delayed by a latency.
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from http.cookies import SimpleCookie
+from threading import Thread, Lock
+from time import sleep
+from urllib.parse import parse_qsl, urlsplit
+from pathlib import Path
+from json import dumps, loads
+from uuid import uuid4
+from typing import Union
+
+
+RECORDINGS = Path(__file__).parent / 'recordings'
+SESSION_COOKIE = 'replay_session'
+
+
+class ReplayServer:
+    recording: dict
+    received: list[dict]
+    latency: float
+
+    def __init__(self, recording_name: str = 'control.json', latency: float = 0.0):
+        self.recording = loads((RECORDINGS / recording_name).read_text())
+        self.received = []
+        self.latency = latency
+        self._served: dict[int, int] = {}
+        self._sessions: set[str] = set()
+        self._lock = Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self._thread = Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address
+        return f'http://{host}:{port}/'
+
+    @property
+    def paths(self) -> dict[str, str]:
+        return self.recording['paths']
+
+    def start(self) -> 'ReplayServer':
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def expire_sessions(self):
+        with self._lock:
+            self._sessions.clear()
+
+    def serve_page(self, body: str, path: str = '/'):
+        # replaces the recorded page before the server starts, e.g. with a portal stand-in a browser can drive
+        exchanges = [exchange for exchange in self.recording['exchanges']
+                     if (exchange['method'], exchange['path']) != ('GET', path)]
+        self.recording['exchanges'] = [{'method': 'GET', 'path': path, 'body': body}] + exchanges
+
+    def requests_to(self, path: str) -> list[dict]:
+        return [request for request in self.received if request['path'] == path]
+
+    def _exchange(self, method: str, path: str, form: dict) -> Union[None, dict]:
+        candidates = [
+            (index, exchange) for index, exchange in enumerate(self.recording['exchanges'])
+            if exchange['method'] == method and exchange['path'] == path
+            and all(form.get(key) == value for key, value in exchange.get('form', {}).items())]
+        if not candidates:
+            return None
+        # the first exchange not served yet, the last one once all were
+        for index, exchange in candidates:
+            if not self._served.get(index):
+                self._served[index] = 1
+                return exchange
+        return candidates[-1][1]
+
+    def _respond(self, method: str, path: str, form: dict, headers: dict, cookie: str) -> tuple[int, dict, bytes]:
+        with self._lock:
+            self.received.append({'method': method, 'path': path, 'form': form, 'headers': headers})
+            open_paths = ('/', self.paths['sign_in'])
+            if path not in open_paths and cookie not in self._sessions:
+                return 401, {'Content-Type': 'text/plain'}, b'signed out'
+            exchange = self._exchange(method, path, form)
+            if exchange is None:
+                return 404, {'Content-Type': 'text/plain'}, f'no recorded {method} {path}'.encode()
+            status = exchange.get('status', 200)
+            body = exchange['body']
+            content_type = exchange.get('content_type') or (
+                'text/html; charset=utf-8' if isinstance(body, str) else 'application/json; charset=utf-8')
+            response_headers = {'Content-Type': content_type}
+            refused = isinstance(body, dict) and (body.get('Errors') or body.get('Success') is False)
+            if path == self.paths['sign_in'] and status < 400 and not refused:
+                session = uuid4().hex
+                self._sessions.add(session)
+                response_headers['Set-Cookie'] = f'{SESSION_COOKIE}={session}; Path=/; HttpOnly'
+            content = (body if isinstance(body, str) else dumps(body)).encode()
+            return status, response_headers, content
+
+    def _handler(self) -> type:
+        server = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            def _replay(self):
+                split = urlsplit(self.path)
+                length = int(self.headers.get('Content-Length') or 0)
+                form = dict(parse_qsl(self.rfile.read(length).decode(), keep_blank_values=True))
+                form.update(parse_qsl(split.query, keep_blank_values=True))
+                cookie = SimpleCookie(self.headers.get('Cookie') or '').get(SESSION_COOKIE)
+                sleep(server.latency)
+                status, headers, content = server._respond(
+                    self.command, split.path, form, dict(self.headers), cookie.value if cookie else '')
+                self.send_response(status)
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.send_header('Content-Length', str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            do_GET = do_POST = _replay
+
+            def log_message(self, *_):
+                pass
+
+        return _Handler
@@ -0,0 +1,111 @@
+from src.external_apis import drive_http
+from src.external_apis.drive_control import SettingOutcome
+from src.external_apis.drive_http import (
+    HttpContainersDriver, HttpDriverError, _ControlSession, _FallbackContainersDriver)
+from tests.replay_server import ReplayServer
+from unittest import TestCase
+from unittest.mock import patch
+
+
+class _ReplayCase(TestCase):
+    server: ReplayServer
+    session: _ControlSession
+
+    def setUp(self):
+        self.server = ReplayServer().start()
+        self.addCleanup(self.server.stop)
+        self.session = _ControlSession(self.server.url, 'replay-user', 'replay-password')
+        paths = self.server.paths
+        paths_patch = patch.multiple(
+            drive_http, SIGN_IN_PATH=paths['sign_in'], CONTAINERS_PATH=paths['containers'],
+            COMMANDS_PATH=paths['commands'], COMMAND_PATH=paths['command'], CANCEL_PATH=paths['cancel'])
+        paths_patch.start()
+        self.addCleanup(paths_patch.stop)
+
+    def driver(self) -> HttpContainersDriver:
+        return HttpContainersDriver(self.session)
+
+    def posted(self, path_key: str) -> list[dict]:
+        return [request['form'] for request in self.server.requests_to(self.server.paths[path_key])]
+
+
+class TestHttpSignIn(_ReplayCase):
+    def test_posts_credentials_and_token(self):
+        self.driver().read_values()
+        sign_in = self.server.requests_to(self.server.paths['sign_in'])
+        self.assertEqual(len(sign_in), 1)
+        self.assertEqual(sign_in[0]['form']['UserName'], 'replay-user')
+        self.assertEqual(sign_in[0]['form']['Password'], 'replay-password')
+        self.assertEqual(sign_in[0]['headers']['RequestVerificationToken'], 'replay-token')
+
+    def test_rejected_sign_in_raises(self):
+        session = _ControlSession(self.server.url, 'replay-user', 'wrong-password')
+        with self.assertRaises(HttpDriverError):
+            HttpContainersDriver(session).read_values()
+
+    def test_signs_in_again_after_session_expired(self):
+        driver = self.driver()
+        driver.read_values()
+        self.server.expire_sessions()
+        driver.read_values()
+        self.assertEqual(self.session.sign_ins, 2)
+
+
+class TestHttpReadValues(_ReplayCase):
+    def test_grid_rows_become_checks(self):
+        checks = {check.name: check for check in self.driver().read_values()}
+        self.assertEqual(len(checks), 8)
+        self.assertEqual(checks['MSKU1000011'].setpoint, '5.0')
+        self.assertEqual(checks['MSKU1000011'].logged, '18/10/2026 10:00')
+        self.assertEqual(checks['MSKU1000044'].power, 'Off')
+        self.assertEqual(checks['MSKU1000055'].setpoint, '')
+
+
+class TestHttpSetTemperatures(_ReplayCase):
+    def test_outcomes(self):
+        containers = ['MSKU1000011', 'MSKU1000022', 'MSKU1000033', 'MSKU1000044', 'MSKU1000055', 'MSKU1000066',
+                      'MSKU1000088', 'MSKU0000000']
+        outcomes = self.driver().check_containers_and_set_temperatures(
+            {container: '-1.0' for container in containers})
+        self.assertEqual([outcome.outcome for outcome in outcomes], [
+            'set', 'set', 'awaiting confirmation', 'off', 'no set point', 'failed', 'active', 'missing'])
+
+    def test_previous_setting_canceled_before_command(self):
+        self.driver().check_containers_and_set_temperatures({'MSKU1000022': '-1.0'})
+        self.assertEqual(self.posted('cancel'), [{'commandId': '71'}])
+        self.assertEqual(self.posted('command'), [{'containerId': '2', 'setpoint': '-1.0'}])
+        paths = [request['path'] for request in self.server.received]
+        self.assertLess(paths.index(self.server.paths['cancel']), paths.index(self.server.paths['command']))
+
+    def test_no_command_while_awaiting_confirmation(self):
+        self.driver().check_containers_and_set_temperatures({'MSKU1000033': '-1.0'})
+        self.assertEqual(self.posted('cancel'), [])
+        self.assertEqual(self.posted('command'), [])
+
+    def test_server_error_raises_with_done_outcomes_kept(self):
+        driver = self.driver()
+        with self.assertRaises(drive_http.RequestException):
+            driver.check_containers_and_set_temperatures({'MSKU1000011': '-1.0', 'MSKU1000077': '-1.0'})
+        self.assertEqual([(outcome.container, outcome.outcome) for outcome in driver.outcomes],
+                         [('MSKU1000011', 'set')])
+
+
+class _BrowserStandIn:
+    # the fallback driver, recording what it was asked to set
+    settings: list[dict]
+
+    def check_containers_and_set_temperatures(self, settings: dict[str, str]) -> list[SettingOutcome]:
+        type(self).settings.append(settings)
+        return [SettingOutcome(container, temperature, 'set', 0.0, None) for container, temperature in settings.items()]
+
+
+class TestFallback(_ReplayCase):
+    def test_browser_sets_only_unfinished_containers(self):
+        stand_in = type('BrowserStandIn', (_BrowserStandIn,), {'settings': []})
+        with patch.object(drive_http, 'ControlContainersDriver', stand_in):
+            outcomes = _FallbackContainersDriver(self.session).check_containers_and_set_temperatures(
+                {'MSKU1000011': '-1.0', 'MSKU1000077': '-1.0', 'MSKU1000022': '-1.0'})
+        self.assertEqual(stand_in.settings, [{'MSKU1000077': '-1.0', 'MSKU1000022': '-1.0'}])
+        self.assertEqual([outcome.container for outcome in outcomes], ['MSKU1000011', 'MSKU1000077', 'MSKU1000022'])
+        self.assertEqual(self.posted('command'), [{'containerId': '1', 'setpoint': '-1.0'},
+                                                  {'containerId': '7', 'setpoint': '-1.0'}])
@@ -0,0 +1,60 @@
+from src.external_apis import measure
+from src.external_apis.measure import _LxmlParser, _MeasureSession, _SoupParser, iter_thermometers
+from tests.measure_server import MeasureServer, device_page
+from tests.replay_server import RECORDINGS
+from unittest import TestCase
+from unittest.mock import patch
+
+
+MEASURE_RECORDINGS = RECORDINGS / 'measure'
+
+
+class _MeasureCase(TestCase):
+    server: MeasureServer
+    pages = 23
+
+    def setUp(self):
+        self.server = MeasureServer(pages=self.pages, rows=5).start()
+        self.addCleanup(self.server.stop)
+        measure_patch = patch.multiple(
+            measure, base_url=self.server.url, login='measure-user', password='measure-password',
+            measure_session=_MeasureSession())
+        measure_patch.start()
+        self.addCleanup(measure_patch.stop)
+
+
+class TestIterPages(_MeasureCase):
+    def test_reads_every_page_in_order(self):
+        reads = list(iter_thermometers())
+        self.assertEqual([read.device_id for read in reads], [str(100000 + number) for number in range(23 * 5)])
+        self.assertEqual({read.page_href for read in reads[:5]}, {''})
+        self.assertEqual({read.page_href for read in reads[-5:]}, {'?page=23'})
+
+    def test_fetches_each_page_once(self):
+        list(iter_thermometers())
+        page_requests = [request for request in self.server.received if request.startswith('GET /devices?page=')]
+        self.assertEqual(sorted(page_requests), sorted(f'GET /devices?page={page}' for page in range(2, 24)))
+
+
+class TestParsers(TestCase):
+    @staticmethod
+    def pages() -> dict[str, bytes]:
+        recorded = {path.name: path.read_bytes() for path in sorted(MEASURE_RECORDINGS.glob('*.html'))}
+        return {**recorded, 'generated': device_page(7, 23, 50).encode()}
+
+    def test_parsers_read_the_same_rows_and_hrefs(self):
+        for name, content in self.pages().items():
+            soup, document = _SoupParser.parse(content), _LxmlParser.parse(content)
+            for extract in ('table_rows', 'next_page_hrefs', 'pagination_hrefs'):
+                with self.subTest(page=name, extract=extract):
+                    self.assertEqual(getattr(_LxmlParser, extract)(document), getattr(_SoupParser, extract)(soup))
+
+    def test_recorded_pages(self):
+        pages = self.pages()
+        document = _LxmlParser.parse(pages['devices_1.html'])
+        self.assertEqual(_LxmlParser.table_rows(document)[2][2:], [
+            'Reefer MSKU\xa01000011', 'Halle A & B', '-2.1', '18.10.2026 10:01', '4712'])
+        self.assertEqual(_LxmlParser.next_page_hrefs(document), ['?page=2&per-page=5'])
+        middle, last = _LxmlParser.parse(pages['devices_6.html']), _LxmlParser.parse(pages['devices_12.html'])
+        self.assertEqual(_LxmlParser.next_page_hrefs(middle), ['?page=7&per-page=5'])
+        self.assertEqual(_LxmlParser.next_page_hrefs(last), [])